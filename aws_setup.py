@@ -4,9 +4,10 @@ AWS Infrastructure Setup Script
 Creates S3 bucket, EC2 instance, and configures necessary resources
 """
 
-import boto3
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 # Configuration
@@ -18,14 +19,47 @@ SECURITY_GROUP_NAME = "mlops-security-group"
 KEY_PAIR_NAME = "mlops-keypair"
 AVAILABILITY_ZONE = f"{REGION}a"
 
-# Initialize AWS clients
-s3_client = boto3.client('s3', region_name=REGION)
-ec2_client = boto3.client('ec2', region_name=REGION)
-iam_client = boto3.client('iam', region_name=REGION)
+# Shared client config: keep-alive sockets, a pool large enough for the
+# concurrent setup calls, and adaptive retries for throttled requests
+BOTO_CONFIG = Config(
+    region_name=REGION,
+    tcp_keepalive=True,
+    max_pool_connections=32,
+    retries={'max_attempts': 10, 'mode': 'adaptive'}
+)
+
+# AWS clients (created by init_clients() so importing this module stays cheap)
+s3_client = None
+ec2_client = None
+iam_client = None
+
+def init_clients():
+    """Import boto3 and create the AWS clients used by the setup steps"""
+    global s3_client, ec2_client, iam_client
+    import boto3
+    
+    s3_client = boto3.client('s3', config=BOTO_CONFIG)
+    ec2_client = boto3.client('ec2', config=BOTO_CONFIG)
+    iam_client = boto3.client('iam', config=BOTO_CONFIG)
 
 def create_s3_bucket():
     """Create S3 bucket for datasets"""
     print(f"\n📦 Creating S3 bucket: {BUCKET_NAME}")
+    
+    # On re-runs the bucket usually exists already - one HEAD settles that
+    try:
+        s3_client.head_bucket(Bucket=BUCKET_NAME)
+        print(f"⚠️  Bucket already exists: {BUCKET_NAME}")
+        return True
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        if error_code == '403':
+            print(f"❌ Bucket already exists (owned by another account): {BUCKET_NAME}")
+            return False
+        elif error_code != '404':
+            print(f"❌ Error checking bucket: {e}")
+            return False
+    
     try:
         if REGION == 'us-east-1':
             s3_client.create_bucket(Bucket=BUCKET_NAME)
@@ -61,55 +95,78 @@ def create_security_group():
     try:
         response = ec2_client.create_security_group(
             GroupName=SECURITY_GROUP_NAME,
-            Description='Security group for MLOps Water Potability application',
-            Region=REGION
+            Description='Security group for MLOps Water Potability application'
         )
         sg_id = response['GroupId']
+        existing_rules = set()  # A new group has no inbound rules yet
         print(f"✅ Security group created: {sg_id}")
-        
-        # Add inbound rules
-        # SSH access
-        ec2_client.authorize_security_group_ingress(
-            GroupId=sg_id,
-            IpPermissions=[
-                {
-                    'IpProtocol': 'tcp',
-                    'FromPort': 22,
-                    'ToPort': 22,
-                    'IpRanges': [{'CidrIp': '0.0.0.0/0', 'Description': 'SSH access'}]
-                },
-                {
-                    'IpProtocol': 'tcp',
-                    'FromPort': 80,
-                    'ToPort': 80,
-                    'IpRanges': [{'CidrIp': '0.0.0.0/0', 'Description': 'HTTP access'}]
-                },
-                {
-                    'IpProtocol': 'tcp',
-                    'FromPort': 443,
-                    'ToPort': 443,
-                    'IpRanges': [{'CidrIp': '0.0.0.0/0', 'Description': 'HTTPS access'}]
-                },
-                {
-                    'IpProtocol': 'tcp',
-                    'FromPort': 8000,
-                    'ToPort': 8000,
-                    'IpRanges': [{'CidrIp': '0.0.0.0/0', 'Description': 'Application API'}]
-                }
-            ]
-        )
-        print("✅ Inbound rules added (SSH, HTTP, HTTPS, Port 8000)")
-        return sg_id
     except ClientError as e:
         if e.response['Error']['Code'] == 'InvalidGroup.Duplicate':
             # Get existing security group
             response = ec2_client.describe_security_groups(GroupNames=[SECURITY_GROUP_NAME])
             sg_id = response['SecurityGroups'][0]['GroupId']
             print(f"⚠️  Security group already exists: {sg_id}")
-            return sg_id
+            existing_rules = None
         else:
             print(f"❌ Error creating security group: {e}")
             return None
+    
+    # Add inbound rules (SSH, HTTP, HTTPS, application API)
+    ip_permissions = [
+        {
+            'IpProtocol': 'tcp',
+            'FromPort': 22,
+            'ToPort': 22,
+            'IpRanges': [{'CidrIp': '0.0.0.0/0', 'Description': 'SSH access'}]
+        },
+        {
+            'IpProtocol': 'tcp',
+            'FromPort': 80,
+            'ToPort': 80,
+            'IpRanges': [{'CidrIp': '0.0.0.0/0', 'Description': 'HTTP access'}]
+        },
+        {
+            'IpProtocol': 'tcp',
+            'FromPort': 443,
+            'ToPort': 443,
+            'IpRanges': [{'CidrIp': '0.0.0.0/0', 'Description': 'HTTPS access'}]
+        },
+        {
+            'IpProtocol': 'tcp',
+            'FromPort': 8000,
+            'ToPort': 8000,
+            'IpRanges': [{'CidrIp': '0.0.0.0/0', 'Description': 'Application API'}]
+        }
+    ]
+    
+    try:
+        # Only authorize the rules an existing group is missing, so re-runs
+        # don't fail with InvalidPermission.Duplicate
+        if existing_rules is None:
+            response = ec2_client.describe_security_group_rules(
+                Filters=[{'Name': 'group-id', 'Values': [sg_id]}]
+            )
+            existing_rules = {
+                (rule['IpProtocol'], rule['FromPort'], rule['ToPort'], rule.get('CidrIpv4'))
+                for rule in response['SecurityGroupRules']
+                if not rule['IsEgress']
+            }
+        
+        missing = [
+            permission for permission in ip_permissions
+            if (permission['IpProtocol'], permission['FromPort'], permission['ToPort'],
+                permission['IpRanges'][0]['CidrIp']) not in existing_rules
+        ]
+        
+        if missing:
+            ec2_client.authorize_security_group_ingress(GroupId=sg_id, IpPermissions=missing)
+            print(f"✅ Inbound rules added (ports: {', '.join(str(p['FromPort']) for p in missing)})")
+        else:
+            print("⚠️  Inbound rules already configured")
+        return sg_id
+    except ClientError as e:
+        print(f"❌ Error adding inbound rules: {e}")
+        return None
 
 def create_key_pair():
     """Create key pair for EC2 access"""
@@ -193,26 +250,31 @@ def create_iam_role():
     except ClientError as e:
         if 'already exists' in str(e):
             print(f"⚠️  IAM role already exists")
+            import boto3
             return f"arn:aws:iam::{boto3.client('sts').get_caller_identity()['Account']}:role/mlops-ec2-s3-role"
         else:
             print(f"❌ Error creating IAM role: {e}")
             return None
 
-def create_ec2_instance():
+def get_latest_ubuntu_ami():
+    """Look up the latest Ubuntu 22.04 LTS AMI (published by Canonical)"""
+    try:
+        response = ec2_client.describe_images(
+            Owners=['099720109477'],
+            Filters=[
+                {'Name': 'name', 'Values': ['ubuntu/images/hvm-ssd/ubuntu-jammy-22.04-amd64-server-*']},
+                {'Name': 'root-device-type', 'Values': ['ebs']},
+                {'Name': 'state', 'Values': ['available']}
+            ]
+        )
+        return max(response['Images'], key=lambda x: x['CreationDate'])['ImageId']
+    except (ClientError, ValueError) as e:
+        print(f"❌ Error looking up Ubuntu AMI: {e}")
+        return None
+
+def create_ec2_instance(sg_id, ami_id):
     """Create EC2 instance"""
     print(f"\n🖥️  Creating EC2 instance: {INSTANCE_NAME}")
-    
-    # Get latest Ubuntu 22.04 LTS AMI
-    ec2_resource = boto3.resource('ec2', region_name=REGION)
-    images = ec2_resource.images.filter(
-        Filters=[
-            {'Name': 'name', 'Values': ['ubuntu/images/hvm-ssd/ubuntu-jammy-22.04-amd64-server-*']},
-            {'Name': 'root-device-type', 'Values': ['ebs']},
-            {'Name': 'state', 'Values': ['available']}
-        ]
-    )
-    
-    ami_id = sorted(images, key=lambda x: x.creation_date)[-1].id
     print(f"📍 Using AMI: {ami_id} (Ubuntu 22.04 LTS)")
     
     # User data script to install Docker and pull application
@@ -259,7 +321,7 @@ echo "✅ Application started successfully!"
             MaxCount=1,
             InstanceType=INSTANCE_TYPE,
             KeyName=KEY_PAIR_NAME,
-            SecurityGroupIds=['sg-12345678'],  # Will be replaced with actual SG ID
+            SecurityGroupIds=[sg_id],
             UserData=user_data_script,
             TagSpecifications=[
                 {
@@ -278,9 +340,13 @@ echo "✅ Application started successfully!"
         print(f"✅ EC2 instance created: {instance_id}")
         print(f"⏳ Instance is starting... (this may take a few minutes)")
         
-        # Wait for instance to start
+        # Wait for instance to start (poll every 3s instead of the default 15s;
+        # 80 attempts keeps the same ~4 minute upper bound)
         waiter = ec2_client.get_waiter('instance_running')
-        waiter.wait(InstanceIds=[instance_id])
+        waiter.wait(
+            InstanceIds=[instance_id],
+            WaiterConfig={'Delay': 3, 'MaxAttempts': 80}
+        )
         
         # Get instance details
         instance = ec2_client.describe_instances(InstanceIds=[instance_id])
@@ -304,31 +370,45 @@ def main():
     print(f"EC2 Instance: {INSTANCE_NAME} ({INSTANCE_TYPE})")
     print("=" * 60)
     
-    # Create S3 bucket
-    if not create_s3_bucket():
+    # Clients are created up front, before any worker threads start
+    init_clients()
+    
+    # Create S3 bucket, security group, key pair and IAM role and look up the
+    # AMI concurrently (they don't depend on each other, only the EC2
+    # instance depends on them)
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        f_s3 = executor.submit(create_s3_bucket)
+        f_sg = executor.submit(create_security_group)
+        f_kp = executor.submit(create_key_pair)
+        f_iam = executor.submit(create_iam_role)
+        f_ami = executor.submit(get_latest_ubuntu_ami)
+    
+    if not f_s3.result():
         print("\n❌ Failed to create S3 bucket. Aborting.")
         sys.exit(1)
     
-    # Create security group
-    sg_id = create_security_group()
+    sg_id = f_sg.result()
     if not sg_id:
         print("\n❌ Failed to create security group. Aborting.")
         sys.exit(1)
     
-    # Create key pair
-    key_name = create_key_pair()
+    key_name = f_kp.result()
     if not key_name:
         print("\n❌ Failed to create key pair. Aborting.")
         sys.exit(1)
     
-    # Create IAM role
-    role_arn = create_iam_role()
+    role_arn = f_iam.result()
     if not role_arn:
         print("\n❌ Failed to create IAM role. Aborting.")
         sys.exit(1)
     
+    ami_id = f_ami.result()
+    if not ami_id:
+        print("\n❌ Failed to find an Ubuntu AMI. Aborting.")
+        sys.exit(1)
+    
     # Create EC2 instance
-    instance_id, public_ip = create_ec2_instance()
+    instance_id, public_ip = create_ec2_instance(sg_id, ami_id)
     if not instance_id:
         print("\n❌ Failed to create EC2 instance. Aborting.")
         sys.exit(1)
@@ -3,26 +3,78 @@ FastAPI Application for Water Potability Prediction
 Serves the trained ML model via REST API with Swagger documentation
 """
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager, redirect_stdout, redirect_stderr, suppress
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-import joblib
 import numpy as np
+import msgpack
+import asyncio
+import io
 import os
 import sys
+import threading
+from operator import attrgetter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 
 # Add src directory to path for model_manager import
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 from model_manager import model_manager
 
+
+# Serializes model loads: the startup load, on-demand loads and version
+# switches all go through the manager's (unlocked) model cache
+model_load_lock = None
+
+
+def get_model_lock() -> asyncio.Lock:
+    """The model load lock, created on first use on the running loop"""
+    global model_load_lock
+    if model_load_lock is None:
+        model_load_lock = asyncio.Lock()
+    return model_load_lock
+
+
+async def load_model_in_background():
+    """Load the model on a worker thread without blocking startup"""
+    try:
+        async with get_model_lock():
+            await asyncio.to_thread(load_model)
+    except Exception as e:
+        print(f"Warning: Could not load model on startup: {e}")
+        print("Model will be loaded on first prediction request.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start loading the model in the background so /health answers immediately"""
+    global model_load_lock
+    # Blocking model calls run on this pool via asyncio.to_thread
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=os.cpu_count())
+    )
+    model_load_lock = asyncio.Lock()
+    app.state.model_loader = asyncio.create_task(load_model_in_background())
+    start_batcher()
+    try:
+        yield
+    finally:
+        # Don't leave the startup load or the batcher running past shutdown
+        app.state.model_loader.cancel()
+        with suppress(asyncio.CancelledError):
+            await app.state.model_loader
+        await stop_batcher()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Water Potability Prediction API",
     description="API for predicting water potability based on physicochemical properties",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow frontend requests
@@ -37,12 +89,34 @@ app.add_middleware(
 # Mount static files directory
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Global variables to store the model and scaler
+# The (model, scaler, fused_scaling) triple used for predictions, published
+# as one tuple so a swap on a worker thread is a single assignment and an
+# in-flight request never mixes one version's model with another's scaling.
+# fused_scaling is StandardScaler folded into float32 (mean, 1/scale) arrays,
+# see prepare_for_inference
+_serving = None
+# Installed model; only used as the readiness flag for /health and /ready
 model = None
-scaler = None
 MODEL_PATH = "models/model.joblib"
 SCALER_PATH = "models/scaler.joblib"
 
+# Model input columns, in training order
+FEATURE_KEYS = (
+    'ph', 'Hardness', 'Solids', 'Chloramines', 'Sulfate',
+    'Conductivity', 'Organic_carbon', 'Trihalomethanes', 'Turbidity'
+)
+
+# Human-readable labels indexed by predicted class (0 = Not Potable, 1 = Potable)
+LABELS = ("Not Potable", "Potable")
+
+# Micro-batching for /predict: single requests arriving within MAX_WAIT_MS
+# of each other are scored together, up to MAX_BATCH rows per model call.
+# MAX_BATCH=1 disables batching and scores every request on its own.
+MAX_BATCH = int(os.environ.get("MAX_BATCH", "64"))
+MAX_WAIT_MS = float(os.environ.get("MAX_WAIT_MS", "5"))
+batch_queue = None
+batch_flusher = None
+
 
 # Pydantic model for input validation
 class WaterQualityFeatures(BaseModel):
@@ -94,41 +168,219 @@ class PredictionResponse(BaseModel):
         }
 
 
+class BatchPredictionResponse(BaseModel):
+    """
+    Output schema for batch prediction results
+    """
+    predictions: List[PredictionResponse] = Field(..., description="Predictions, in the same order as the input samples")
+    count: int = Field(..., description="Number of predictions")
+
+
+def prepare_for_inference(loaded_model, loaded_scaler):
+    """Adapt a freshly loaded model/scaler pair for float32 inference"""
+    # Requests already run concurrently on the inference thread pool, so
+    # run each estimator single-threaded instead of dispatching a thread
+    # pool per predict call (per-call overhead dominates on small inputs)
+    for estimator in [loaded_model, *getattr(loaded_model, 'estimators_', [])]:
+        if 'n_jobs' in estimator.get_params(deep=False):
+            estimator.set_params(n_jobs=1)
+    
+    # Imported here, not at module level: pulling in sklearn costs ~1.5 s
+    # of API startup, while unpickling the scaler has already loaded it
+    from sklearn.preprocessing import StandardScaler
+    
+    # Fold StandardScaler's (x - mean_) / scale_ into float32 constants so
+    # inputs can be scaled in place with one subtract and one multiply
+    fused = None
+    if isinstance(loaded_scaler, StandardScaler):
+        n_features = loaded_scaler.n_features_in_
+        mean = loaded_scaler.mean_ if loaded_scaler.with_mean else np.zeros(n_features)
+        scale = loaded_scaler.scale_ if loaded_scaler.with_std else np.ones(n_features)
+        fused = (
+            np.asarray(mean, dtype=np.float32),
+            np.asarray(1.0 / scale, dtype=np.float32)
+        )
+    
+    return loaded_model, loaded_scaler, fused
+
+
+def install_model(new_model, new_scaler):
+    """Make a model/scaler pair the one used for predictions"""
+    global _serving, model
+    _serving = prepare_for_inference(new_model, new_scaler)
+    model = _serving[0]
+
+
 def load_model():
     """Load the trained model and scaler from disk (current version)"""
-    global model, scaler
     try:
         # Load current version from model manager
         current_version = model_manager.get_current_version()
-        model, scaler = model_manager.load_model_and_scaler(current_version)
+        loaded_model, loaded_scaler = model_manager.load_model_and_scaler(current_version)
         print(f"[OK] Model loaded successfully: {current_version}")
         print(f"[OK] Scaler loaded successfully")
     except Exception as e:
         # Fallback to original loading method
+        from io_utils import load_artifact
+        
         if not os.path.exists(MODEL_PATH):
             raise FileNotFoundError(
                 f"Model file not found at {MODEL_PATH}. "
                 "Please train the model first by running: dvc repro"
             )
-        model = joblib.load(MODEL_PATH)
+        loaded_model = load_artifact(MODEL_PATH)
         print(f"[OK] Model loaded successfully from {MODEL_PATH}")
         
         # Load scaler if it exists
         if os.path.exists(SCALER_PATH):
-            scaler = joblib.load(SCALER_PATH)
+            loaded_scaler = load_artifact(SCALER_PATH)
             print(f"[OK] Scaler loaded successfully from {SCALER_PATH}")
         else:
+            loaded_scaler = None
             print("[WARN] No scaler found, using raw features")
+    
+    install_model(loaded_model, loaded_scaler)
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Load model when the API starts"""
+async def ensure_model_loaded():
+    """
+    Make sure a model is installed before serving a prediction
+    
+    Waits for the startup load if it is still running instead of starting
+    a second one; loads on demand only if that load failed. Raises 503 if
+    no model can be loaded.
+    """
+    if model is not None:
+        return
+    
     try:
-        load_model()
+        async with get_model_lock():
+            if model is None:
+                await asyncio.to_thread(load_model)
     except Exception as e:
-        print(f"Warning: Could not load model on startup: {e}")
-        print("Model will be loaded on first prediction request.")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model not available: {str(e)}"
+        )
+
+
+def run_inference(input_data: np.ndarray):
+    """
+    Scale an (N, 9) feature matrix and run the model on it
+    
+    Blocking (NumPy/sklearn); the async endpoints call it via asyncio.to_thread.
+    input_data must be a float32 array owned by the caller - it is scaled in place.
+    Returns the predicted classes and the confidence of each prediction.
+    """
+    current_model, current_scaler, current_scaling = _serving
+    
+    # Apply scaler if available (in place on the freshly built float32 input)
+    if current_scaling is not None:
+        mean, inv_scale = current_scaling
+        np.subtract(input_data, mean, out=input_data)
+        np.multiply(input_data, inv_scale, out=input_data)
+    elif current_scaler is not None:
+        input_data = current_scaler.transform(input_data)
+    
+    # Make predictions
+    preds = current_model.predict(input_data).astype(int)
+    
+    # Get prediction probabilities/confidences
+    if hasattr(current_model, 'predict_proba'):
+        probs = current_model.predict_proba(input_data)
+        confidences = probs[np.arange(len(preds)), preds]
+    else:
+        confidences = np.ones(len(preds))  # Default confidence if probabilities not available
+    
+    return preds, confidences
+
+
+# Returns the FEATURE_KEYS values of one sample as a tuple (single C-level call)
+feature_row = attrgetter(*FEATURE_KEYS)
+
+
+# Per-thread (1, 9) float32 scratch row reused by single predictions
+_thread_local = threading.local()
+
+
+def predict_single(features: WaterQualityFeatures):
+    """
+    Run inference for one sample using this thread's scratch row
+    
+    Must run on the worker thread (not the event loop) so concurrent
+    requests never share a buffer.
+    """
+    buf = getattr(_thread_local, 'buf', None)
+    if buf is None:
+        buf = _thread_local.buf = np.empty((1, 9), dtype=np.float32)
+    
+    buf[0] = feature_row(features)
+    
+    return run_inference(buf)
+
+
+async def flush_loop(queue: asyncio.Queue):
+    """Drain queued single predictions in batches and score each batch with one model call"""
+    loop = asyncio.get_running_loop()
+    while True:
+        items = [await queue.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+        
+        # Collect more requests until the batch is full or the wait budget is spent
+        while len(items) < MAX_BATCH:
+            if not queue.empty():
+                items.append(queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        rows, futures = zip(*items)
+        try:
+            input_data = np.asarray(rows, dtype=np.float32)
+            preds, confidences = await asyncio.to_thread(run_inference, input_data)
+        except Exception as e:
+            for fut in futures:
+                if not fut.done():
+                    fut.set_exception(e)
+            continue
+        
+        for fut, prediction, confidence in zip(futures, preds.tolist(), confidences.tolist()):
+            if not fut.done():  # The client may have gone away meanwhile
+                fut.set_result((prediction, confidence))
+
+
+def start_batcher():
+    """Create the micro-batching queue and its flush task on the running loop"""
+    global batch_queue, batch_flusher
+    batch_queue = asyncio.Queue()
+    batch_flusher = asyncio.create_task(flush_loop(batch_queue))
+
+
+async def stop_batcher():
+    """Cancel the flush task (on shutdown)"""
+    global batch_queue, batch_flusher
+    if batch_flusher is not None:
+        batch_flusher.cancel()
+        try:
+            await batch_flusher
+        except asyncio.CancelledError:
+            pass
+    batch_queue = batch_flusher = None
+
+
+async def predict_batched(features: WaterQualityFeatures):
+    """Queue one sample for the micro-batcher and wait for its (prediction, confidence)"""
+    if batch_queue is None:
+        start_batcher()
+    
+    fut = asyncio.get_running_loop().create_future()
+    await batch_queue.put((feature_row(features), fut))
+    return await fut
 
 
 @app.get("/", tags=["Root"])
@@ -164,6 +416,23 @@ async def health_check() -> Dict[str, Any]:
     }
 
 
+@app.get("/ready", tags=["Health"])
+async def readiness_check() -> Dict[str, Any]:
+    """
+    Readiness check endpoint - succeeds only once the model is loaded
+    """
+    if model is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Model is still loading"
+        )
+    
+    return {
+        "status": "ready",
+        "model_loaded": True
+    }
+
+
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
 async def predict(features: WaterQualityFeatures) -> PredictionResponse:
     """
@@ -181,48 +450,20 @@ async def predict(features: WaterQualityFeatures) -> PredictionResponse:
     
     Returns prediction with confidence score.
     """
-    global model
-    
-    # Load model if not already loaded
-    if model is None:
-        try:
-            load_model()
-        except Exception as e:
-            raise HTTPException(
-                status_code=503,
-                detail=f"Model not available: {str(e)}"
-            )
+    # Load model if not already loaded (or wait for the startup load)
+    await ensure_model_loaded()
     
     try:
-        # Prepare input data
-        input_data = np.array([[
-            features.ph,
-            features.Hardness,
-            features.Solids,
-            features.Chloramines,
-            features.Sulfate,
-            features.Conductivity,
-            features.Organic_carbon,
-            features.Trihalomethanes,
-            features.Turbidity
-        ]])
-        
-        # Apply scaler if available
-        if scaler is not None:
-            input_data = scaler.transform(input_data)
-        
-        # Make prediction
-        prediction = int(model.predict(input_data)[0])
-        
-        # Get prediction probability/confidence
-        if hasattr(model, 'predict_proba'):
-            probabilities = model.predict_proba(input_data)[0]
-            confidence = float(probabilities[prediction])
+        # Make prediction off the event loop
+        if MAX_BATCH > 1:
+            prediction, confidence = await predict_batched(features)
         else:
-            confidence = 1.0  # Default confidence if probabilities not available
+            preds, confidences = await asyncio.to_thread(predict_single, features)
+            prediction = int(preds[0])
+            confidence = float(confidences[0])
         
         # Prepare response
-        potability_label = "Potable" if prediction == 1 else "Not Potable"
+        potability_label = LABELS[prediction]
         
         return PredictionResponse(
             potability=prediction,
@@ -237,63 +478,105 @@ async def predict(features: WaterQualityFeatures) -> PredictionResponse:
         )
 
 
-@app.post("/predict/batch", tags=["Prediction"])
+@app.post("/predict/batch", response_model=BatchPredictionResponse, tags=["Prediction"])
 async def predict_batch(features_list: list[WaterQualityFeatures]) -> Dict[str, Any]:
     """
     Batch prediction endpoint for multiple water samples
     
     Accepts a list of water quality feature sets and returns predictions for all.
     """
-    global model
+    # Load model if not already loaded (or wait for the startup load)
+    await ensure_model_loaded()
     
-    # Load model if not already loaded
-    if model is None:
-        try:
-            load_model()
-        except Exception as e:
-            raise HTTPException(
-                status_code=503,
-                detail=f"Model not available: {str(e)}"
-            )
+    if not features_list:
+        return {"predictions": [], "count": 0}
+    
+    try:
+        # Stack all samples into a single (N, 9) matrix
+        input_data = np.asarray(
+            [feature_row(features) for features in features_list],
+            dtype=np.float32
+        ).reshape(-1, 9)
+        
+        # Make predictions for the whole batch at once, off the event loop
+        preds, confidences = await asyncio.to_thread(run_inference, input_data)
+        
+        predictions = [
+            {
+                "potability": prediction,
+                "potability_label": LABELS[prediction],
+                "confidence": confidence
+            }
+            for prediction, confidence in zip(preds.tolist(), confidences.tolist())
+        ]
+        
+        return {"predictions": predictions, "count": len(predictions)}
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch prediction failed: {str(e)}"
+        )
+
+
+def decode_feature_matrix(body: bytes) -> np.ndarray:
+    """
+    Decode a msgpack {"shape": [N, 9], "data": <float32 bytes>} body
+    
+    Applies the same range checks as WaterQualityFeatures, vectorized over
+    the whole matrix. Raises ValueError on a malformed or out-of-range body.
+    """
+    payload = msgpack.unpackb(body)
+    n_rows, n_cols = payload["shape"]
+    if n_cols != len(FEATURE_KEYS):
+        raise ValueError(f"expected {len(FEATURE_KEYS)} features per sample, got {n_cols}")
+    
+    # Copy out of the request bytes: run_inference scales its input in place
+    input_data = np.frombuffer(payload["data"], dtype=np.float32).reshape(n_rows, n_cols).copy()
+    
+    if not np.isfinite(input_data).all() or (input_data < 0).any():
+        raise ValueError("features must be finite and non-negative")
+    if (input_data[:, FEATURE_KEYS.index("ph")] > 14).any():
+        raise ValueError("ph must be between 0 and 14")
+    
+    return input_data
+
+
+@app.post("/predict/batch_bin", response_model=BatchPredictionResponse, tags=["Prediction"])
+async def predict_batch_bin(request: Request) -> Dict[str, Any]:
+    """
+    Binary batch prediction endpoint
+    
+    Same as /predict/batch, but the request body is msgpack
+    (content-type: application/x-msgpack) holding {"shape": [N, 9], "data": bytes},
+    where data is the row-major float32 feature matrix in FEATURE_KEYS order.
+    Skips per-field JSON/Pydantic parsing, which dominates for large batches.
+    """
+    # Load model if not already loaded (or wait for the startup load)
+    await ensure_model_loaded()
     
     try:
-        predictions = []
+        input_data = decode_feature_matrix(await request.body())
+    except Exception as e:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Invalid msgpack batch: {str(e)}"
+        )
+    
+    if len(input_data) == 0:
+        return {"predictions": [], "count": 0}
+    
+    try:
+        preds, confidences = await asyncio.to_thread(run_inference, input_data)
         
-        for features in features_list:
-            # Prepare input data
-            input_data = np.array([[
-                features.ph,
-                features.Hardness,
-                features.Solids,
-                features.Chloramines,
-                features.Sulfate,
-                features.Conductivity,
-                features.Organic_carbon,
-                features.Trihalomethanes,
-                features.Turbidity
-            ]])
-            
-            # Apply scaler if available
-            if scaler is not None:
-                input_data = scaler.transform(input_data)
-            
-            # Make prediction
-            prediction = int(model.predict(input_data)[0])
-            
-            # Get prediction probability/confidence
-            if hasattr(model, 'predict_proba'):
-                probabilities = model.predict_proba(input_data)[0]
-                confidence = float(probabilities[prediction])
-            else:
-                confidence = 1.0
-            
-            potability_label = "Potable" if prediction == 1 else "Not Potable"
-            
-            predictions.append({
+        predictions = [
+            {
                 "potability": prediction,
-                "potability_label": potability_label,
+                "potability_label": LABELS[prediction],
                 "confidence": confidence
-            })
+            }
+            for prediction, confidence in zip(preds.tolist(), confidences.tolist())
+        ]
         
         return {"predictions": predictions, "count": len(predictions)}
         
@@ -340,50 +623,33 @@ async def retrain_model(request: RetrainRequest) -> Dict[str, Any]:
     This endpoint allows incremental learning by adding new labeled data
     and creating a new model version.
     """
-    import sys
-    import io
-    import traceback
-    
     try:
-        # Suppress stdout/stderr during retraining to avoid encoding issues
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
-        sys.stdout = io.StringIO()
-        sys.stderr = io.StringIO()
-        
-        try:
-            # Convert Pydantic model to dict
-            water_data = {
-                'ph': request.water_quality.ph,
-                'Hardness': request.water_quality.Hardness,
-                'Solids': request.water_quality.Solids,
-                'Chloramines': request.water_quality.Chloramines,
-                'Sulfate': request.water_quality.Sulfate,
-                'Conductivity': request.water_quality.Conductivity,
-                'Organic_carbon': request.water_quality.Organic_carbon,
-                'Trihalomethanes': request.water_quality.Trihalomethanes,
-                'Turbidity': request.water_quality.Turbidity
-            }
-            
-            # Retrain using model manager
-            result = model_manager.retrain_incremental(water_data, request.actual_potability)
-            
-            # Reload the model (new version is now current)
-            load_model()
-            
-            # Return sanitized version
-            return {
-                "success": result.get("success", True),
-                "version": result.get("version", "V1"),
-                "training_samples": result.get("training_samples", 0),
-                "incremental_samples": result.get("incremental_samples", 1),
-                "accuracy": result.get("accuracy", 0.0),
-                "cv_accuracy": result.get("cv_accuracy", 0.0),
-                "message": f"Model {result.get('version', 'V1')} trained successfully"
-            }
-        finally:
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
+        # Hold the model lock so a still-running startup load can neither
+        # race the retrain on the manager's cache nor override its model
+        async with get_model_lock():
+            # Suppress stdout/stderr during retraining to avoid encoding issues
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                # Convert Pydantic model to dict
+                water_data = dict(zip(FEATURE_KEYS, feature_row(request.water_quality)))
+                
+                # Retrain using model manager
+                result, new_model, new_scaler = model_manager.retrain_incremental(
+                    water_data, request.actual_potability
+                )
+                
+                # Serve the freshly trained model (new version is now current)
+                install_model(new_model, new_scaler)
+                
+                # Return sanitized version
+                return {
+                    "success": result.get("success", True),
+                    "version": result.get("version", "V1"),
+                    "training_samples": result.get("training_samples", 0),
+                    "incremental_samples": result.get("incremental_samples", 1),
+                    "accuracy": result.get("accuracy", 0.0),
+                    "cv_accuracy": result.get("cv_accuracy", 0.0),
+                    "message": f"Model {result.get('version', 'V1')} trained successfully"
+                }
         
     except Exception as e:
         # Sanitize error message
@@ -451,8 +717,11 @@ async def switch_model_version(request: SwitchVersionRequest) -> Dict[str, Any]:
                 detail=f"Version '{request.version}' not found"
             )
         
-        # Reload the model with new version
-        load_model()
+        # Install the new version; versions loaded or retrained earlier in
+        # this process come from the manager's cache instead of disk. The
+        # lock also keeps a still-running startup load from overriding it
+        async with get_model_lock():
+            await asyncio.to_thread(load_model)
         
         return {
             "success": True,
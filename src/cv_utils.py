@@ -0,0 +1,54 @@
+"""
+Cross-validation helpers shared by evaluation and incremental retraining
+"""
+
+import os
+from joblib import parallel_backend
+from sklearn.base import clone
+from sklearn.model_selection import cross_val_score
+
+
+def single_threaded_clone(model):
+    """
+    Unfitted copy of a model with every (nested) n_jobs set to 1
+
+    The folds already run in parallel, so letting each ensemble member
+    spread over all cores as well only oversubscribes the CPU.
+    """
+    model = clone(model)
+    params = model.get_params()
+    model.set_params(**{
+        key: 1 for key in params
+        if key == 'n_jobs' or key.endswith('__n_jobs')
+    })
+    return model
+
+
+def cross_val_accuracy(model, X, y, cv=5):
+    """
+    Cross-validated accuracy with one worker per fold
+
+    Args:
+        model: Estimator to evaluate (cloned, never fitted in place)
+        X: Feature matrix
+        y: Labels
+        cv: Number of folds, a splitter, or a list of (train, test) indices
+
+    Returns:
+        Array of per-fold accuracy scores
+    """
+    if isinstance(cv, int):
+        n_folds = cv
+    elif hasattr(cv, 'get_n_splits'):
+        n_folds = cv.get_n_splits()
+    else:
+        n_folds = len(cv)
+    outer_jobs = min(n_folds, os.cpu_count() or 1)
+
+    # Cap BLAS/OpenMP threads inside each worker as well
+    with parallel_backend('loky', inner_max_num_threads=1):
+        return cross_val_score(
+            single_threaded_clone(model), X, y,
+            cv=cv, scoring='accuracy',
+            n_jobs=outer_jobs, pre_dispatch='2*n_jobs'
+        )
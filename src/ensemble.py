@@ -0,0 +1,117 @@
+"""
+Soft-voting ensemble for Water Potability Prediction
+Fits its member models in parallel processes and averages their probabilities
+"""
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.utils.validation import check_is_fitted
+
+
+# Up to this many rows, forests are scored with a plain loop over their
+# trees (the single-row API case) instead of through predict_proba
+SMALL_BATCH = 128
+
+
+def _forest_proba(forest, X):
+    """RandomForest predict_proba without per-call validation and dispatch"""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    out = np.zeros((X.shape[0], forest.n_classes_), dtype=np.float64)
+    for tree in forest.estimators_:
+        out += tree.predict_proba(X, check_input=False)
+    out /= len(forest.estimators_)
+    return out
+
+
+def _member_proba(estimator, X):
+    """Class probabilities of one ensemble member"""
+    if isinstance(estimator, RandomForestClassifier) and X.shape[0] <= SMALL_BATCH:
+        return _forest_proba(estimator, X)
+    return estimator.predict_proba(X)
+
+
+class SoftVoteEnsemble(ClassifierMixin, BaseEstimator):
+    """
+    Soft-voting classifier over a list of (name, estimator) pairs
+    
+    Unlike VotingClassifier, each member is fitted in its own loky worker
+    process, so members should be configured with a small n_jobs of their
+    own instead of all cores. get_params/set_params delegate to the members
+    under <name>__<param> keys, as in VotingClassifier, so clone() and
+    cv_utils.single_threaded_clone reach the members' n_jobs. This is done
+    here rather than through scikit-learn's private _BaseComposition so
+    saved models only depend on the public BaseEstimator.
+    
+    Args:
+        estimators: List of (name, estimator) tuples
+        n_jobs: Worker processes used for fitting (default: one per member)
+    """
+    
+    def __init__(self, estimators, n_jobs=None):
+        self.estimators = estimators
+        self.n_jobs = n_jobs
+    
+    def get_params(self, deep=True):
+        """Parameters of the ensemble and, if deep, of every member"""
+        params = super().get_params(deep=False)
+        if deep:
+            for name, estimator in self.estimators:
+                params[name] = estimator
+                for key, value in estimator.get_params(deep=True).items():
+                    params[f'{name}__{key}'] = value
+        return params
+    
+    def set_params(self, **params):
+        """Set ensemble parameters, whole members (<name>) or <name>__<param>"""
+        if 'estimators' in params:
+            self.estimators = params.pop('estimators')
+        
+        members = dict(self.estimators)
+        member_params = {}
+        for key in list(params):
+            name, _, member_key = key.partition('__')
+            if name not in members:
+                continue
+            if member_key:
+                member_params.setdefault(name, {})[member_key] = params.pop(key)
+            else:
+                members[name] = params.pop(key)
+        
+        self.estimators = [(name, members[name]) for name, _ in self.estimators]
+        for name, member_kwargs in member_params.items():
+            members[name].set_params(**member_kwargs)
+        
+        super().set_params(**params)
+        return self
+    
+    def fit(self, X, y):
+        """Fit clones of all members concurrently"""
+        members = [estimator for _, estimator in self.estimators]
+        n_jobs = self.n_jobs if self.n_jobs is not None else len(members)
+        
+        self.estimators_ = Parallel(n_jobs=n_jobs, backend='loky')(
+            delayed(clone(estimator).fit)(X, y) for estimator in members
+        )
+        self.named_estimators_ = dict(zip(
+            (name for name, _ in self.estimators), self.estimators_
+        ))
+        self.classes_ = np.unique(y)
+        self.n_features_in_ = X.shape[1]
+        return self
+    
+    def predict_proba(self, X):
+        """Average the members' class probabilities"""
+        check_is_fitted(self, 'estimators_')
+        # Accumulate into one buffer instead of stacking every member's output
+        first, *rest = self.estimators_
+        out = np.array(_member_proba(first, X), dtype=np.float64)
+        for estimator in rest:
+            np.add(out, _member_proba(estimator, X), out=out)
+        out *= 1.0 / len(self.estimators_)
+        return out
+    
+    def predict(self, X):
+        """Most probable class for each row"""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -3,26 +3,27 @@ Model Evaluation Script for Water Potability Prediction
 Generates detailed classification metrics, confusion matrix, and cross-validation scores
 """
 
-import pandas as pd
 import numpy as np
 import joblib
 import json
 import os
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score, 
-    confusion_matrix, classification_report, roc_auc_score
-)
-from sklearn.model_selection import cross_val_score, StratifiedKFold
+import argparse
+from sklearn.metrics import precision_recall_fscore_support, roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from io_utils import read_table
+from cv_utils import cross_val_accuracy
 
 
-def evaluate_model(train_path, model_path, metrics_output):
+def evaluate_model(train_path, model_path, metrics_output, enable_cv=False, verbose=False):
     """
     Comprehensive model evaluation with detailed metrics
     
     Args:
-        train_path: Path to training data CSV
+        train_path: Path to training data (Parquet or CSV)
         model_path: Path to trained model
         metrics_output: Path to save metrics JSON
+        enable_cv: Also run 5-fold cross-validation (refits the model 5 times)
+        verbose: Also print per-class precision, recall and F1
     """
     print("\n" + "="*70)
     print("🔍 MODEL EVALUATION - Water Potability Prediction")
@@ -30,37 +31,41 @@ def evaluate_model(train_path, model_path, metrics_output):
     
     # Load training data and model
     print("📂 Loading data and model...")
-    train_data = pd.read_csv(train_path)
+    train_data = read_table(train_path)
     model = joblib.load(model_path)
     
     # Separate features and target
-    X = train_data.drop('Potability', axis=1)
+    X = np.ascontiguousarray(train_data.drop('Potability', axis=1).to_numpy(), dtype=np.float32)
     y = train_data['Potability']
     
     print(f"   ✓ Training samples: {len(X)}")
     print(f"   ✓ Features: {X.shape[1]}")
-    print(f"   ✓ Class distribution: Not Potable={sum(y==0)}, Potable={sum(y==1)}")
+    class_counts = np.bincount(y.to_numpy().astype(np.intp), minlength=2)
+    print(f"   ✓ Class distribution: Not Potable={class_counts[0]}, Potable={class_counts[1]}")
     
     # Make predictions on training set
     print("\n📊 Generating predictions on training data...")
-    y_pred = model.predict(X)
-    y_pred_proba = model.predict_proba(X)[:, 1]
+    # One forward pass; the predicted class is the most probable one
+    proba = model.predict_proba(X)
+    y_pred = model.classes_[proba.argmax(axis=1)]
+    y_pred_proba = proba[:, 1]
+    
+    # Confusion Matrix: count all four (actual, predicted) cells in one pass
+    tn, fp, fn, tp = np.bincount(
+        2 * y.to_numpy().astype(np.intp) + y_pred.astype(np.intp), minlength=4
+    )
     
     # Calculate metrics
-    accuracy = accuracy_score(y, y_pred)
-    precision = precision_score(y, y_pred, zero_division=0)
-    recall = recall_score(y, y_pred, zero_division=0)
-    f1 = f1_score(y, y_pred, zero_division=0)
+    accuracy = (tn + tp) / len(y)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
     
     try:
         roc_auc = roc_auc_score(y, y_pred_proba)
     except:
         roc_auc = 0.0
     
-    # Confusion Matrix
-    cm = confusion_matrix(y, y_pred)
-    tn, fp, fn, tp = cm.ravel()
-    
     print("\n" + "="*70)
     print("📈 TRAINING SET PERFORMANCE")
     print("="*70)
@@ -82,49 +87,54 @@ def evaluate_model(train_path, model_path, metrics_output):
     print(f"False Negatives (FN): {fn}")
     print(f"True Positives (TP):  {tp}")
     
-    print("\n" + "="*70)
-    print("📋 DETAILED CLASSIFICATION REPORT")
-    print("="*70)
-    print(classification_report(
-        y, y_pred, 
-        target_names=['Not Potable (0)', 'Potable (1)'],
-        digits=4
-    ))
+    if verbose:
+        print("\n" + "="*70)
+        print("📋 DETAILED CLASSIFICATION REPORT")
+        print("="*70)
+        per_class = precision_recall_fscore_support(y, y_pred, labels=[0, 1], zero_division=0)
+        print(f"{'':<18}{'precision':>10}{'recall':>10}{'f1-score':>10}{'support':>10}")
+        for i, name in enumerate(['Not Potable (0)', 'Potable (1)']):
+            p, r, f, n = (col[i] for col in per_class)
+            print(f"{name:<18}{p:>10.4f}{r:>10.4f}{f:>10.4f}{n:>10d}")
     
     # Cross-Validation Evaluation
-    print("\n" + "="*70)
-    print("🔄 CROSS-VALIDATION ANALYSIS (5-Fold Stratified)")
-    print("="*70)
-    print("Performing 5-fold cross-validation to assess generalization...")
-    
-    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
-    cv_scores = cross_val_score(model, X, y, cv=cv, scoring='accuracy', n_jobs=-1)
-    
-    print(f"\nFold Scores: {[f'{score:.4f}' for score in cv_scores]}")
-    print(f"Mean CV Accuracy: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
-    print(f"Min CV Accuracy:  {cv_scores.min():.4f}")
-    print(f"Max CV Accuracy:  {cv_scores.max():.4f}")
-    
-    # Check for overfitting
-    train_accuracy = accuracy
-    cv_accuracy = cv_scores.mean()
-    overfitting_gap = train_accuracy - cv_accuracy
-    
-    print("\n" + "-"*70)
-    print("⚠️  OVERFITTING CHECK")
-    print("-"*70)
-    print(f"Training Accuracy:        {train_accuracy:.4f} ({train_accuracy*100:.2f}%)")
-    print(f"Cross-Validation Accuracy: {cv_accuracy:.4f} ({cv_accuracy*100:.2f}%)")
-    print(f"Overfitting Gap:          {overfitting_gap:.4f} ({overfitting_gap*100:.2f}%)")
-    
-    if overfitting_gap > 0.10:
-        print("❌ WARNING: Model shows significant overfitting (gap > 10%)")
-        print("   Consider: Increase regularization, reduce model complexity")
-    elif overfitting_gap > 0.05:
-        print("⚠️  CAUTION: Model shows moderate overfitting (gap > 5%)")
-        print("   Model may benefit from additional regularization")
+    cv_scores = None
+    if enable_cv:
+        print("\n" + "="*70)
+        print("🔄 CROSS-VALIDATION ANALYSIS (5-Fold Stratified)")
+        print("="*70)
+        print("Performing 5-fold cross-validation to assess generalization...")
+        
+        cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+        cv_scores = cross_val_accuracy(model, X, y, cv=cv)
+        
+        print(f"\nFold Scores: {[f'{score:.4f}' for score in cv_scores]}")
+        print(f"Mean CV Accuracy: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
+        print(f"Min CV Accuracy:  {cv_scores.min():.4f}")
+        print(f"Max CV Accuracy:  {cv_scores.max():.4f}")
+        
+        # Check for overfitting
+        train_accuracy = accuracy
+        cv_accuracy = cv_scores.mean()
+        overfitting_gap = train_accuracy - cv_accuracy
+        
+        print("\n" + "-"*70)
+        print("⚠️  OVERFITTING CHECK")
+        print("-"*70)
+        print(f"Training Accuracy:        {train_accuracy:.4f} ({train_accuracy*100:.2f}%)")
+        print(f"Cross-Validation Accuracy: {cv_accuracy:.4f} ({cv_accuracy*100:.2f}%)")
+        print(f"Overfitting Gap:          {overfitting_gap:.4f} ({overfitting_gap*100:.2f}%)")
+        
+        if overfitting_gap > 0.10:
+            print("❌ WARNING: Model shows significant overfitting (gap > 10%)")
+            print("   Consider: Increase regularization, reduce model complexity")
+        elif overfitting_gap > 0.05:
+            print("⚠️  CAUTION: Model shows moderate overfitting (gap > 5%)")
+            print("   Model may benefit from additional regularization")
+        else:
+            print("✅ GOOD: Model shows minimal overfitting (gap < 5%)")
     else:
-        print("✅ GOOD: Model shows minimal overfitting (gap < 5%)")
+        print("\n⏭️  Skipping cross-validation (pass --cv to enable)")
     
     # Save metrics to JSON
     metrics = {
@@ -146,13 +156,13 @@ def evaluate_model(train_path, model_path, metrics_output):
             "cv_std": float(cv_scores.std()),
             "cv_min": float(cv_scores.min()),
             "cv_max": float(cv_scores.max())
-        },
+        } if enable_cv else None,
         "overfitting_analysis": {
             "training_accuracy": float(train_accuracy),
             "cv_accuracy": float(cv_accuracy),
             "overfitting_gap": float(overfitting_gap),
             "overfitting_status": "high" if overfitting_gap > 0.10 else ("moderate" if overfitting_gap > 0.05 else "low")
-        }
+        } if enable_cv else None
     }
     
     # Create output directory if needed
@@ -170,10 +180,17 @@ def evaluate_model(train_path, model_path, metrics_output):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the trained model")
+    parser.add_argument("--cv", action="store_true",
+                        help="run 5-fold cross-validation (refits the model 5 times)")
+    parser.add_argument("--verbose", action="store_true",
+                        help="print per-class precision, recall and F1")
+    args = parser.parse_args()
+    
     # Define paths
-    TRAIN_PATH = "data/train.csv"
+    TRAIN_PATH = "data/train.parquet"
     MODEL_PATH = "models/model.joblib"
     METRICS_OUTPUT = "metrics.json"
     
     # Run evaluation
-    evaluate_model(TRAIN_PATH, MODEL_PATH, METRICS_OUTPUT)
+    evaluate_model(TRAIN_PATH, MODEL_PATH, METRICS_OUTPUT, enable_cv=args.cv, verbose=args.verbose)
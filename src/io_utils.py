@@ -0,0 +1,80 @@
+"""
+Table I/O helpers shared by the pipeline stages and the model manager
+"""
+
+import pandas as pd
+import joblib
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import os
+
+
+def read_table(path):
+    """
+    Load a dataset, dispatching on the file extension
+
+    CSV files are parsed by pyarrow's multithreaded reader rather than
+    pandas' single-threaded one; columns come back with the same numpy
+    dtypes pandas would infer (float64/int64, NaN for missing values).
+
+    Args:
+        path: Path to a .parquet or .csv file, or a directory of .parquet parts
+
+    Returns:
+        pandas DataFrame
+    """
+    if os.fspath(path).endswith('.parquet') or os.path.isdir(path):
+        return pd.read_parquet(path, engine='pyarrow')
+    table = pacsv.read_csv(path, read_options=pacsv.ReadOptions(use_threads=True))
+    return table.to_pandas()
+
+
+def write_table(df, path):
+    """
+    Save a dataset as zstd-compressed Parquet
+
+    Float columns are cast to float32 before writing, which halves the file
+    size and the bandwidth needed to read it back.
+
+    Args:
+        df: DataFrame to save
+        path: Output .parquet path
+    """
+    float_cols = df.select_dtypes(include='float').columns
+    if len(float_cols):
+        df = df.astype({col: 'float32' for col in float_cols})
+    df.to_parquet(path, engine='pyarrow', compression='zstd', index=False)
+
+
+def write_columns(columns, path):
+    """
+    Save a mapping of column name -> 1-D array as zstd-compressed Parquet
+
+    Goes straight to a pyarrow table, for small writes where building a
+    DataFrame would cost more than the write itself.
+
+    Args:
+        columns: Dict of column name to array, all the same length
+        path: Output .parquet path
+    """
+    pq.write_table(pa.table(columns), path, compression='zstd')
+
+
+def load_artifact(path):
+    """
+    joblib.load a model artifact
+
+    Uncompressed pickles are memory-mapped so several API workers share
+    the same page-cache pages. Compressed ones cannot be mapped (joblib
+    would warn and read them anyway) and are loaded normally.
+
+    Args:
+        path: Path to a .joblib file
+
+    Returns:
+        The unpickled object
+    """
+    with open(path, 'rb') as f:
+        is_raw_pickle = f.read(1) == b'\x80'
+    return joblib.load(path, mmap_mode='r' if is_raw_pickle else None)
@@ -4,27 +4,80 @@ Handles multiple model versions, saving, loading, and metadata tracking
 """
 
 import os
-import json
+import io
+import orjson
+import warnings
 import joblib
 import pandas as pd
 import numpy as np
+import functools
 from datetime import datetime
+from collections import OrderedDict
+from contextlib import ExitStack, redirect_stdout, redirect_stderr
 from pathlib import Path
-from sklearn.ensemble import VotingClassifier, RandomForestClassifier, GradientBoostingClassifier
-from xgboost import XGBClassifier
-from sklearn.model_selection import cross_val_score
 from typing import Dict, List, Any, Tuple
+from io_utils import read_table, write_table, write_columns, load_artifact
+
+
+# Feature columns in training order
+FEATURES = (
+    'ph', 'Hardness', 'Solids', 'Chloramines', 'Sulfate',
+    'Conductivity', 'Organic_carbon', 'Trihalomethanes', 'Turbidity'
+)
+
+
+@functools.cache
+def _get_estimator_classes():
+    """
+    Import the training stack on first use
+    
+    xgboost and the sklearn ensembles are only needed to retrain, so
+    listing, switching and deleting versions never pay for loading them.
+    """
+    from sklearn.ensemble import VotingClassifier, RandomForestClassifier, GradientBoostingClassifier
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBClassifier
+    from cv_utils import cross_val_accuracy
+    return (
+        VotingClassifier, RandomForestClassifier, GradientBoostingClassifier,
+        XGBClassifier, StandardScaler, StratifiedKFold, cross_val_accuracy
+    )
 
 
 class ModelVersionManager:
     """Manages multiple versions of trained models"""
     
+    # Number of loaded versions kept in memory
+    MODEL_CACHE_SIZE = 4
+    # Incremental part files allowed before they are merged into one
+    MAX_INCREMENTAL_PARTS = 64
+    
     def __init__(self, models_dir: str = "models"):
         self.models_dir = Path(models_dir)
         self.versions_dir = self.models_dir / "versions"
         self.versions_dir.mkdir(parents=True, exist_ok=True)
         self.metadata_file = self.versions_dir / "metadata.json"
-        self.training_data_file = self.versions_dir / "incremental_training_data.csv"
+        # Append-only store: one Parquet part file per collected sample,
+        # periodically compacted into part-000000 (see _compact_incremental_data)
+        self.training_data_dir = self.versions_dir / "incremental_training_data"
+        # Single-file stores written by older versions, migrated on first use
+        self.legacy_training_data_files = [
+            self.versions_dir / "incremental_training_data.parquet",
+            self.versions_dir / "incremental_training_data.csv"
+        ]
+        
+        # Sorted list_versions() result, rebuilt after every metadata change
+        self._versions_cache = None
+        
+        # Loaded (mtime, model, scaler) per version, least recently used first
+        self._model_cache = OrderedDict()
+        # Data-set/train_dataset as (features, labels) arrays, reused by every retrain
+        self._original_train = None
+        # All incremental samples (features, labels), loaded on first retrain
+        self._incremental_X = None
+        self._incremental_y = None
+        self._incremental_parts = 0
         
         # Initialize metadata
         self._load_metadata()
@@ -32,8 +85,7 @@ class ModelVersionManager:
     def _load_metadata(self):
         """Load metadata from file or create new"""
         if self.metadata_file.exists():
-            with open(self.metadata_file, 'r') as f:
-                self.metadata = json.load(f)
+            self.metadata = orjson.loads(self.metadata_file.read_bytes())
         else:
             # Initialize with original model
             self.metadata = {
@@ -54,8 +106,12 @@ class ModelVersionManager:
     
     def _save_metadata(self):
         """Save metadata to file"""
-        with open(self.metadata_file, 'w') as f:
-            json.dump(self.metadata, indent=2, fp=f)
+        self._versions_cache = None
+        # Write a sibling file and swap it in, so an interrupted save never
+        # leaves a truncated metadata.json behind
+        tmp_file = self.metadata_file.with_suffix('.tmp')
+        tmp_file.write_bytes(orjson.dumps(self.metadata, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_file, self.metadata_file)
     
     def get_current_version(self) -> str:
         """Get the current active model version"""
@@ -63,6 +119,12 @@ class ModelVersionManager:
     
     def list_versions(self) -> List[Dict[str, Any]]:
         """List all available model versions"""
+        if self._versions_cache is None:
+            self._versions_cache = self._build_versions_list()
+        return list(self._versions_cache)
+    
+    def _build_versions_list(self) -> List[Dict[str, Any]]:
+        """Build the sorted version list served by list_versions"""
         versions = []
         for version_name, version_info in self.metadata["versions"].items():
             versions.append({
@@ -116,11 +178,25 @@ class ModelVersionManager:
             model_path = self.versions_dir / version_info["model_path"]
             scaler_path = self.versions_dir / version_info["scaler_path"]
         
-        model = joblib.load(model_path)
-        scaler = joblib.load(scaler_path)
+        mtime = model_path.stat().st_mtime
+        cached = self._model_cache.get(version_name)
+        if cached is not None and cached[0] == mtime:
+            self._model_cache.move_to_end(version_name)
+            return cached[1], cached[2]
         
+        model = load_artifact(model_path)
+        scaler = load_artifact(scaler_path)
+        
+        self._cache_model(version_name, mtime, model, scaler)
         return model, scaler
     
+    def _cache_model(self, version_name: str, mtime: float, model: Any, scaler: Any):
+        """Store a loaded version, evicting the least recently used one"""
+        self._model_cache[version_name] = (mtime, model, scaler)
+        self._model_cache.move_to_end(version_name)
+        while len(self._model_cache) > self.MODEL_CACHE_SIZE:
+            self._model_cache.popitem(last=False)
+    
     def _get_next_version_number(self) -> str:
         """Get the next version number"""
         version_nums = []
@@ -135,7 +211,7 @@ class ModelVersionManager:
         next_num = max(version_nums) + 1 if version_nums else 1
         return f"V{next_num}"
     
-    def retrain_incremental(self, new_data: Dict[str, float], actual_label: int) -> Dict[str, Any]:
+    def retrain_incremental(self, new_data: Dict[str, float], actual_label: int) -> Tuple[Dict[str, Any], Any, Any]:
         """
         Retrain model with new data point
         
@@ -144,105 +220,150 @@ class ModelVersionManager:
             actual_label: Actual potability (0 or 1)
         
         Returns:
-            Dictionary with retraining results
+            Tuple of (retraining results dict, new fitted model, new fitted scaler)
         """
-        import sys
-        import io
-        import os
-        import warnings
+        # Suppress all output and warnings to avoid encoding issues. The
+        # filters are restored on exit instead of leaking to other requests.
+        with ExitStack() as stack:
+            stack.enter_context(redirect_stdout(io.StringIO()))
+            stack.enter_context(redirect_stderr(io.StringIO()))
+            stack.enter_context(warnings.catch_warnings())
+            warnings.simplefilter('ignore')
+            return self._do_retrain(new_data, actual_label)
+    
+    def _load_original_train(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Load the original training dataset as arrays, cached after the first read"""
+        if self._original_train is not None:
+            return self._original_train
         
-        # Suppress all output and warnings to avoid encoding issues
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
-        warnings.filterwarnings('ignore')
-        os.environ['PYTHONIOENCODING'] = 'utf-8'
+        # Try multiple paths to find the dataset
+        dataset_paths = [
+            "Data-set/train_dataset.csv",
+            "../Data-set/train_dataset.csv",
+            "/app/Data-set/train_dataset.csv",
+            os.path.expanduser("~/Mlops-Project/Data-set/train_dataset.csv")
+        ]
         
-        sys.stdout = open(os.devnull, 'w')
-        sys.stderr = open(os.devnull, 'w')
+        original_train = None
+        for path in dataset_paths:
+            try:
+                if os.path.exists(path):
+                    original_train = read_table(path)
+                    break
+            except:
+                continue
         
-        try:
-            return self._do_retrain(new_data, actual_label)
-        finally:
-            sys.stdout.close()
-            sys.stderr.close()
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
+        if original_train is None:
+            raise FileNotFoundError(
+                f"Could not find train_dataset.csv in any of these locations: {dataset_paths}"
+            )
+        
+        self._original_train = (
+            original_train[list(FEATURES)].to_numpy(dtype=np.float64),
+            original_train['Potability'].to_numpy(dtype=np.int64)
+        )
+        return self._original_train
     
-    def _do_retrain(self, new_data: Dict[str, float], actual_label: int) -> Dict[str, Any]:
-        """Internal retraining logic"""
-        import warnings
-        warnings.filterwarnings('ignore')
+    def _load_incremental_data(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Load the incremental samples once and keep them in memory as arrays"""
+        if self._incremental_X is not None:
+            return self._incremental_X, self._incremental_y
+        
+        frames = []
+        n_rows = 0
+        # Parts are named by the index of their first row. A compacted
+        # part-000000 covers every row before the next live part, so skip
+        # any older single-row parts an interrupted compaction left behind
+        for part in sorted(self.training_data_dir.glob("part-*.parquet")):
+            if int(part.stem[len("part-"):]) < n_rows:
+                continue
+            frames.append(read_table(part))
+            n_rows += len(frames[-1])
+        
+        if frames:
+            incremental_df = pd.concat(frames, ignore_index=True)
+            self._incremental_parts = len(frames)
+        else:
+            incremental_df = pd.DataFrame(columns=[*FEATURES, 'Potability'])
+            for legacy_file in self.legacy_training_data_files:
+                if legacy_file.exists():
+                    incremental_df = read_table(legacy_file)
+                    break
+            # Carry the old single-file store over as the first part
+            if len(incremental_df):
+                self.training_data_dir.mkdir(exist_ok=True)
+                write_table(incremental_df, self.training_data_dir / "part-000000.parquet")
+                self._incremental_parts = 1
         
+        self._incremental_X = incremental_df[list(FEATURES)].to_numpy(dtype=np.float32)
+        self._incremental_y = incremental_df['Potability'].to_numpy(dtype=np.int64)
+        return self._incremental_X, self._incremental_y
+    
+    def _append_incremental_row(self, row: np.ndarray, label: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Persist one new sample as its own part file and return all samples"""
+        incremental_X, incremental_y = self._load_incremental_data()
+        
+        columns = {name: row[i:i + 1] for i, name in enumerate(FEATURES)}
+        columns['Potability'] = np.array([label], dtype=np.int64)
+        self.training_data_dir.mkdir(exist_ok=True)
+        write_columns(columns, self.training_data_dir / f"part-{len(incremental_y):06d}.parquet")
+        
+        self._incremental_X = np.vstack([incremental_X, row])
+        self._incremental_y = np.append(incremental_y, label)
+        self._incremental_parts += 1
+        
+        if self._incremental_parts > self.MAX_INCREMENTAL_PARTS:
+            self._compact_incremental_data()
+        return self._incremental_X, self._incremental_y
+    
+    def _compact_incremental_data(self):
+        """Rewrite all incremental samples as a single part-000000 file"""
+        columns = {
+            name: np.ascontiguousarray(self._incremental_X[:, i])
+            for i, name in enumerate(FEATURES)
+        }
+        columns['Potability'] = self._incremental_y
+        
+        # Atomically replace part-000000 first, then drop the parts it now
+        # covers; the loader skips any that survive a crash in between
+        first_part = self.training_data_dir / "part-000000.parquet"
+        tmp_file = self.training_data_dir / "part-000000.parquet.tmp"
+        write_columns(columns, tmp_file)
+        os.replace(tmp_file, first_part)
+        for part in self.training_data_dir.glob("part-*.parquet"):
+            if part != first_part:
+                part.unlink()
+        self._incremental_parts = 1
+    
+    def _do_retrain(self, new_data: Dict[str, float], actual_label: int) -> Tuple[Dict[str, Any], Any, Any]:
+        """Internal retraining logic"""
         try:
-            # Load current model and scaler
-            current_model, current_scaler = self.load_model_and_scaler()
-            
-            # Load or create incremental training data
-            if self.training_data_file.exists():
-                incremental_df = pd.read_csv(self.training_data_file)
-            else:
-                # Start with empty dataframe
-                incremental_df = pd.DataFrame(columns=[
-                    'ph', 'Hardness', 'Solids', 'Chloramines', 'Sulfate',
-                    'Conductivity', 'Organic_carbon', 'Trihalomethanes', 'Turbidity',
-                    'Potability'
-                ])
-            
             # Add new data point
-            new_row = {
-                'ph': new_data.get('ph', 0),
-                'Hardness': new_data.get('Hardness', 0),
-                'Solids': new_data.get('Solids', 0),
-                'Chloramines': new_data.get('Chloramines', 0),
-                'Sulfate': new_data.get('Sulfate', 0),
-                'Conductivity': new_data.get('Conductivity', 0),
-                'Organic_carbon': new_data.get('Organic_carbon', 0),
-                'Trihalomethanes': new_data.get('Trihalomethanes', 0),
-                'Turbidity': new_data.get('Turbidity', 0),
-                'Potability': actual_label
-            }
-            incremental_df = pd.concat([incremental_df, pd.DataFrame([new_row])], ignore_index=True)
-            
-            # Save updated incremental data
-            incremental_df.to_csv(self.training_data_file, index=False)
-            
-            # Load original training data
-            # Try multiple paths to find the dataset
-            dataset_paths = [
-                "Data-set/train_dataset.csv",
-                "../Data-set/train_dataset.csv",
-                "/app/Data-set/train_dataset.csv",
-                os.path.expanduser("~/Mlops-Project/Data-set/train_dataset.csv")
-            ]
-            
-            original_train = None
-            for path in dataset_paths:
-                try:
-                    if os.path.exists(path):
-                        original_train = pd.read_csv(path)
-                        break
-                except:
-                    continue
+            row = np.fromiter(
+                (new_data.get(k, 0.0) for k in FEATURES), dtype=np.float32, count=len(FEATURES)
+            )
+            incremental_X, incremental_y = self._append_incremental_row(row, actual_label)
             
-            if original_train is None:
-                raise FileNotFoundError(
-                    f"Could not find train_dataset.csv in any of these locations: {dataset_paths}"
-                )
+            # Load original training data (parsed once per process)
+            original_X, original_y = self._load_original_train()
             
-            # Combine original + incremental data
-            combined_df = pd.concat([original_train, incremental_df], ignore_index=True)
+            # Combine original + incremental data (one copy of each)
+            X = np.concatenate([original_X, incremental_X])
+            y = np.concatenate([original_y, incremental_y])
             
-            # Prepare features and labels
-            X = combined_df.drop('Potability', axis=1)
-            y = combined_df['Potability']
+            (VotingClassifier, RandomForestClassifier, GradientBoostingClassifier,
+             XGBClassifier, StandardScaler, StratifiedKFold,
+             cross_val_accuracy) = _get_estimator_classes()
             
             # Fit scaler on combined data
-            from sklearn.preprocessing import StandardScaler
             new_scaler = StandardScaler()
             X_scaled = new_scaler.fit_transform(X)
             
             # NO print statements during training to avoid encoding issues
             
+            # One voting worker per member, the cores split between them
+            inner_jobs = max(1, (os.cpu_count() or 4) // 3)
+            
             rf_model = RandomForestClassifier(
                 n_estimators=250,
                 max_depth=6,
@@ -250,10 +371,16 @@ class ModelVersionManager:
                 min_samples_leaf=9,
                 max_features='sqrt',
                 class_weight='balanced',
+                bootstrap=True,
+                max_samples=0.75,
                 random_state=42,
-                n_jobs=-1
+                n_jobs=inner_jobs
             )
             
+            # Fitted from scratch rather than continued from the current
+            # version's booster: the scaler is refit above, so the old trees'
+            # split thresholds no longer match the scaled features, and the
+            # cross-validation below refits clones from scratch regardless
             xgb_model = XGBClassifier(
                 n_estimators=300,
                 max_depth=4,
@@ -265,7 +392,10 @@ class ModelVersionManager:
                 reg_alpha=0.5,
                 reg_lambda=1.8,
                 random_state=42,
-                n_jobs=-1,
+                n_jobs=inner_jobs,
+                tree_method='hist',
+                device='cpu',
+                enable_categorical=False,
                 eval_metric='logloss'
             )
             
@@ -286,14 +416,17 @@ class ModelVersionManager:
                     ('gb', gb_model)
                 ],
                 voting='soft',
-                n_jobs=-1
+                n_jobs=3
             )
             
             # Train the model
-            new_model.fit(X_scaled, y)
+            with joblib.parallel_backend('loky', n_jobs=3, inner_max_num_threads=inner_jobs):
+                new_model.fit(X_scaled, y)
             
-            # Evaluate with cross-validation
-            cv_scores = cross_val_score(new_model, X_scaled, y, cv=5, scoring='accuracy')
+            # Evaluate with cross-validation on fold indices computed once
+            cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+            splits = list(cv.split(X_scaled, y))
+            cv_scores = cross_val_accuracy(new_model, X_scaled, y, cv=splits)
             
             # Calculate training accuracy
             train_accuracy = new_model.score(X_scaled, y)
@@ -305,15 +438,25 @@ class ModelVersionManager:
             model_filename = f"model_{new_version_name}.joblib"
             scaler_filename = f"scaler_{new_version_name}.joblib"
             
-            joblib.dump(new_model, self.versions_dir / model_filename)
-            joblib.dump(new_scaler, self.versions_dir / scaler_filename)
+            # lz4 decompresses faster than the disk reads it saves;
+            # protocol 5 pickles large arrays without intermediate copies
+            joblib.dump(new_model, self.versions_dir / model_filename,
+                        compress=('lz4', 3), protocol=5)
+            joblib.dump(new_scaler, self.versions_dir / scaler_filename,
+                        compress=('lz4', 3), protocol=5)
+            self._cache_model(
+                new_version_name,
+                (self.versions_dir / model_filename).stat().st_mtime,
+                new_model,
+                new_scaler
+            )
             
             # Update metadata
             self.metadata["versions"][new_version_name] = {
                 "created_at": datetime.now().isoformat(),
-                "description": f"Retrained with {len(incremental_df)} additional sample(s)",
-                "training_samples": len(combined_df),
-                "incremental_samples": len(incremental_df),
+                "description": f"Retrained with {len(incremental_y)} additional sample(s)",
+                "training_samples": len(y),
+                "incremental_samples": len(incremental_y),
                 "model_path": model_filename,
                 "scaler_path": scaler_filename,
                 "accuracy": float(train_accuracy),
@@ -326,16 +469,18 @@ class ModelVersionManager:
             
             # NO print statements to avoid encoding issues
             
-            return {
+            result = {
                 "success": True,
                 "version": new_version_name,
-                "training_samples": len(combined_df),
-                "incremental_samples": len(incremental_df),
+                "training_samples": len(y),
+                "incremental_samples": len(incremental_y),
                 "accuracy": float(train_accuracy),
                 "cv_accuracy": float(cv_scores.mean()),
                 "cv_scores": [float(s) for s in cv_scores],
-                "message": f"Model {new_version_name} trained successfully with {len(combined_df)} samples"
+                "message": f"Model {new_version_name} trained successfully with {len(y)} samples"
             }
+            
+            return result, new_model, new_scaler
         except Exception as e:
             # Sanitize any error messages
             error_str = str(e).encode('ascii', 'ignore').decode('ascii')
@@ -361,6 +506,7 @@ class ModelVersionManager:
             model_path.unlink()
         if scaler_path.exists():
             scaler_path.unlink()
+        self._model_cache.pop(version_name, None)
         
         # Remove from metadata
         del self.metadata["versions"][version_name]
@@ -4,8 +4,14 @@ Generates predictions and saves them
 """
 
 import pandas as pd
+import numpy as np
 import joblib
 import os
+from io_utils import read_table
+
+
+# Indexed by the predicted class
+LABELS = np.array(['Not Potable', 'Potable'], dtype=object)
 
 
 def generate_predictions(test_path, model_path, predictions_output_path):
@@ -13,7 +19,7 @@ def generate_predictions(test_path, model_path, predictions_output_path):
     Generate predictions for test data (no labels)
     
     Args:
-        test_path: Path to test data CSV (features only)
+        test_path: Path to test data (Parquet or CSV, features only)
         model_path: Path to trained model
         predictions_output_path: Path to save predictions
     """
@@ -22,7 +28,7 @@ def generate_predictions(test_path, model_path, predictions_output_path):
     print("="*60)
     
     print(f"\n📂 Loading test data from {test_path}...")
-    test_data = pd.read_csv(test_path)
+    test_data = read_table(test_path)
     print(f"   Test data shape: {test_data.shape}")
     
     # Load the trained model
@@ -32,19 +38,21 @@ def generate_predictions(test_path, model_path, predictions_output_path):
     
     # Make predictions
     print("\n🔮 Making predictions on test data...")
-    predictions = model.predict(test_data)
-    
-    # Get prediction probabilities if available
+    # Same float32 matrix layout the model was trained on
+    features = np.ascontiguousarray(test_data.to_numpy(), dtype=np.float32)
     if hasattr(model, 'predict_proba'):
-        probabilities = model.predict_proba(test_data)
+        # One forward pass; the predicted class is the most probable one
+        probabilities = model.predict_proba(features)
+        predictions = model.classes_[probabilities.argmax(axis=1)]
         confidence = probabilities.max(axis=1)
     else:
-        confidence = [1.0] * len(predictions)
+        predictions = model.predict(features)
+        confidence = np.ones(len(predictions), dtype=np.float32)
     
     # Create predictions DataFrame
     predictions_df = pd.DataFrame({
         'Prediction': predictions,
-        'Prediction_Label': ['Potable' if p == 1 else 'Not Potable' for p in predictions],
+        'Prediction_Label': LABELS[predictions.astype(np.intp)],
         'Confidence': confidence
     })
     
@@ -72,7 +80,7 @@ def generate_predictions(test_path, model_path, predictions_output_path):
 
 if __name__ == "__main__":
     # Define paths
-    TEST_PATH = "data/test.csv"
+    TEST_PATH = "data/test.parquet"
     MODEL_PATH = "models/model.joblib"
     PREDICTIONS_OUTPUT_PATH = "predictions.csv"
     
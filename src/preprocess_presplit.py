@@ -9,6 +9,7 @@ import yaml
 import os
 from sklearn.preprocessing import StandardScaler, PolynomialFeatures
 import joblib
+from io_utils import read_table, write_table
 
 
 def load_params():
@@ -25,14 +26,15 @@ def preprocess_presplit_data(train_input_path, test_input_path, train_output_pat
     Args:
         train_input_path: Path to training data CSV
         test_input_path: Path to test data CSV (features only)
-        train_output_path: Path to save processed training data
-        test_output_path: Path to save processed test data
+        train_output_path: Path to save processed training data (Parquet)
+        test_output_path: Path to save processed test data (Parquet)
     """
     # Load parameters
     params = load_params()
     feature_scaling = params.get('feature_scaling', False)
     add_polynomial = params.get('add_polynomial_features', False)
     poly_degree = params.get('polynomial_degree', 2)
+    interaction_only = params.get('polynomial_interaction_only', False)
     
     print("="*60)
     print("PREPROCESSING PRE-SPLIT WATER POTABILITY DATASET")
@@ -40,23 +42,25 @@ def preprocess_presplit_data(train_input_path, test_input_path, train_output_pat
     
     # Load training data
     print(f"\n📂 Loading training data from {train_input_path}...")
-    train_df = pd.read_csv(train_input_path)
+    train_df = read_table(train_input_path)
+    train_nulls = int(train_df.isna().to_numpy().sum())
     print(f"   Training data shape: {train_df.shape}")
-    print(f"   Missing values: {train_df.isnull().sum().sum()}")
+    print(f"   Missing values: {train_nulls}")
     
     # Load test data (features only)
     print(f"\n📂 Loading test data from {test_input_path}...")
-    test_df = pd.read_csv(test_input_path)
+    test_df = read_table(test_input_path)
+    test_nulls = int(test_df.isna().to_numpy().sum())
     print(f"   Test data shape: {test_df.shape}")
-    print(f"   Missing values: {test_df.isnull().sum().sum()}")
+    print(f"   Missing values: {test_nulls}")
     
     # Check for missing values
-    if train_df.isnull().sum().sum() > 0:
+    if train_nulls > 0:
         print("\n⚠️  Warning: Training data has missing values!")
     else:
         print("\n✅ Training data is complete (no missing values)!")
     
-    if test_df.isnull().sum().sum() > 0:
+    if test_nulls > 0:
         print("⚠️  Warning: Test data has missing values!")
     else:
         print("✅ Test data is complete (no missing values)!")
@@ -66,22 +70,25 @@ def preprocess_presplit_data(train_input_path, test_input_path, train_output_pat
     print(train_df['Potability'].value_counts())
     print(f"   Class balance: {train_df['Potability'].value_counts(normalize=True).round(3).to_dict()}")
     
-    # Separate features and target for training
-    X_train = train_df.drop('Potability', axis=1)
-    y_train = train_df['Potability']
-    X_test = test_df.copy()
+    # Separate features and target for training. Work on contiguous
+    # float32 arrays and only build DataFrames again for the final write.
+    feature_names = [c for c in train_df.columns if c != 'Potability']
+    X_train = np.ascontiguousarray(train_df[feature_names].to_numpy(), dtype=np.float32)
+    y_train = train_df['Potability'].to_numpy()
+    X_test = np.ascontiguousarray(test_df[feature_names].to_numpy(), dtype=np.float32)
     
     # Add polynomial features if enabled
     if add_polynomial:
         print(f"\n� Adding polynomial features (degree={poly_degree})...")
-        poly = PolynomialFeatures(degree=poly_degree, include_bias=False, interaction_only=False)
-        X_train_poly = poly.fit_transform(X_train)
-        X_test_poly = poly.transform(X_test)
+        # Column-major output keeps each feature contiguous for the
+        # per-column mean/variance passes in StandardScaler
+        poly = PolynomialFeatures(degree=poly_degree, include_bias=False,
+                                  interaction_only=interaction_only, order='F')
+        X_train = poly.fit_transform(X_train)
+        X_test = poly.transform(X_test)
         
         # Get feature names
-        feature_names = poly.get_feature_names_out(X_train.columns)
-        X_train = pd.DataFrame(X_train_poly, columns=feature_names, index=X_train.index)
-        X_test = pd.DataFrame(X_test_poly, columns=feature_names, index=X_test.index)
+        feature_names = list(poly.get_feature_names_out(feature_names))
         
         print(f"   ✓ Features expanded from {train_df.shape[1]-1} to {X_train.shape[1]}")
         
@@ -94,47 +101,37 @@ def preprocess_presplit_data(train_input_path, test_input_path, train_output_pat
     if feature_scaling:
         print(f"\n📊 Applying StandardScaler for feature normalization...")
         
-        # Fit scaler on training features
-        scaler = StandardScaler()
-        X_train_scaled = pd.DataFrame(
-            scaler.fit_transform(X_train),
-            columns=X_train.columns,
-            index=X_train.index
-        )
+        # Fit scaler on training features and scale both sets in place
+        scaler = StandardScaler(copy=False)
+        X_train = scaler.fit_transform(X_train)
         
         # Transform test features
-        X_test_scaled = pd.DataFrame(
-            scaler.transform(X_test),
-            columns=X_test.columns,
-            index=X_test.index
-        )
+        X_test = scaler.transform(X_test)
         
-        # Recombine training data with target
-        train_processed = X_train_scaled.copy()
-        train_processed['Potability'] = y_train
-        test_processed = X_test_scaled
-        
-        # Save scaler for API predictions
+        # Save scaler for API predictions; callers expect transform()
+        # to leave their input untouched
+        scaler.set_params(copy=True)
         os.makedirs('models', exist_ok=True)
         joblib.dump(scaler, 'models/scaler.joblib')
         print("   ✓ Scaler saved to models/scaler.joblib")
         print("   ✓ Features scaled successfully!")
     else:
-        train_processed = X_train.copy()
-        train_processed['Potability'] = y_train
-        test_processed = X_test
         print("\n⏭️  Skipping feature scaling (disabled in params)")
     
+    train_processed = pd.DataFrame(X_train, columns=feature_names)
+    train_processed['Potability'] = y_train
+    test_processed = pd.DataFrame(X_test, columns=feature_names)
+    
     # Create output directories if they don't exist
     os.makedirs(os.path.dirname(train_output_path), exist_ok=True)
     os.makedirs(os.path.dirname(test_output_path), exist_ok=True)
     
     # Save processed data
     print(f"\n💾 Saving processed training data to {train_output_path}...")
-    train_processed.to_csv(train_output_path, index=False)
+    write_table(train_processed, train_output_path)
     
     print(f"💾 Saving processed test data to {test_output_path}...")
-    test_processed.to_csv(test_output_path, index=False)
+    write_table(test_processed, test_output_path)
     
     print("\n" + "="*60)
     print("✅ PREPROCESSING COMPLETED SUCCESSFULLY!")
@@ -153,8 +150,8 @@ if __name__ == "__main__":
     # Define paths
     TRAIN_INPUT_PATH = "Data-set/train_dataset.csv"
     TEST_INPUT_PATH = "Data-set/test_dataset.csv"
-    TRAIN_OUTPUT_PATH = "data/train.csv"
-    TEST_OUTPUT_PATH = "data/test.csv"
+    TRAIN_OUTPUT_PATH = "data/train.parquet"
+    TEST_OUTPUT_PATH = "data/test.parquet"
     
     # Run preprocessing
     preprocess_presplit_data(TRAIN_INPUT_PATH, TEST_INPUT_PATH, TRAIN_OUTPUT_PATH, TEST_OUTPUT_PATH)
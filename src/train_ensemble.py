@@ -1,14 +1,31 @@
 """
 Ensemble Training script for Water Potability Prediction
-Combines RandomForest, XGBoost, and GradientBoosting using VotingClassifier
+Combines RandomForest, XGBoost, and HistGradientBoosting with soft voting
 """
 
-import pandas as pd
+import numpy as np
 import yaml
 import joblib
+import json
 import os
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
+import tempfile
+import warnings
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.model_selection import StratifiedShuffleSplit
 from xgboost import XGBClassifier
+from io_utils import read_table
+from ensemble import SoftVoteEnsemble
+
+
+# Progress output is opt-in (TRAIN_VERBOSE=1) so repeated runs don't pay
+# for formatting and flushing it
+VERBOSE = os.environ.get('TRAIN_VERBOSE', '0') == '1'
+
+
+def log(*args, **kwargs):
+    """print() only when TRAIN_VERBOSE=1"""
+    if VERBOSE:
+        print(*args, **kwargs)
 
 
 def load_params():
@@ -18,12 +35,59 @@ def load_params():
     return params['train']
 
 
+def _xgb_device():
+    """
+    Pick the XGBoost device: 'cuda' if this build has CUDA and a GPU
+    is actually usable, otherwise 'cpu'
+    """
+    try:
+        import xgboost
+        if not xgboost.build_info().get('USE_CUDA'):
+            return 'cpu'
+        # XGBoost silently falls back to CPU when no GPU is visible, so
+        # fit a one-tree probe and read back the device it really used
+        probe = XGBClassifier(n_estimators=1, tree_method='hist', device='cuda')
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            probe.fit(np.array([[0.0], [1.0]]), np.array([0, 1]))
+        config = json.loads(probe.get_booster().save_config())
+        return config['learner']['generic_param'].get('device', 'cpu')
+    except Exception:
+        return 'cpu'
+
+
+def _build_xgb(params, random_state, **device_params):
+    """
+    Build the XGBoost classifier used both on its own and in the ensemble
+    
+    Args:
+        params: The 'train' section of params.yaml
+        random_state: Seed for the model
+        **device_params: device/tree_method/n_jobs settings
+    """
+    return XGBClassifier(
+        learning_rate=params.get('learning_rate', 0.01),
+        max_depth=params.get('max_depth_xgb', 4),
+        n_estimators=params.get('n_estimators_xgb', 500),
+        scale_pos_weight=params.get('scale_pos_weight', 1.56),
+        subsample=params.get('subsample', 0.8),
+        colsample_bytree=params.get('colsample_bytree', 0.8),
+        gamma=params.get('gamma', 1.0),
+        min_child_weight=params.get('min_child_weight', 3),
+        reg_alpha=params.get('reg_alpha', 0.3),
+        reg_lambda=params.get('reg_lambda', 1.5),
+        random_state=random_state,
+        eval_metric='logloss',
+        **device_params
+    )
+
+
 def train_ensemble_model(train_path, model_output_path):
     """
     Train a classifier (single or ensemble)
     
     Args:
-        train_path: Path to training data CSV
+        train_path: Path to training data (Parquet or CSV)
         model_output_path: Path to save the trained model
     """
     # Load parameters
@@ -31,59 +95,67 @@ def train_ensemble_model(train_path, model_output_path):
     random_state = params['random_state']
     model_type = params.get('model_type', 'Ensemble')
     
-    print(f"Loading training data from {train_path}...")
-    train_data = pd.read_csv(train_path)
+    # GPU histogram building when available; on CPU use every core
+    xgb_device = _xgb_device()
+    xgb_parallel = {'device': xgb_device, 'tree_method': 'hist'}
+    if xgb_device == 'cpu':
+        xgb_parallel['n_jobs'] = -1
+    log(f"XGBoost device: {xgb_device}")
     
-    # Separate features and target
-    X_train = train_data.drop('Potability', axis=1)
+    log(f"Loading training data from {train_path}...")
+    train_data = read_table(train_path)
+    
+    # Separate features and target. One C-contiguous float32 matrix is
+    # shared by all learners instead of each converting its own copy.
+    X_train = np.ascontiguousarray(train_data.drop('Potability', axis=1).to_numpy(), dtype=np.float32)
     y_train = train_data['Potability']
     
-    print(f"Training data shape: {X_train.shape}")
-    print(f"Target distribution:\n{y_train.value_counts()}")
+    log(f"Training data shape: {X_train.shape}")
+    if VERBOSE:
+        print(f"Target distribution:\n{y_train.value_counts()}")
     
-    # Split for early stopping validation
-    from sklearn.model_selection import train_test_split
-    X_tr, X_val, y_tr, y_val = train_test_split(
-        X_train, y_train, test_size=0.2, random_state=random_state, stratify=y_train
-    )
-    print(f"   Train: {len(X_tr)}, Validation: {len(X_val)}")
+    # Split for early stopping validation (stratified row indices into the
+    # shared arrays; the same split train_test_split(stratify=...) draws)
+    y_np = y_train.to_numpy()
+    splitter = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=random_state)
+    tr_idx, val_idx = next(splitter.split(np.zeros(len(y_np)), y_np))
+    X_tr, X_val = X_train[tr_idx], X_train[val_idx]
+    y_tr, y_val = y_np[tr_idx], y_np[val_idx]
+    log(f"   Train: {len(X_tr)}, Validation: {len(X_val)}")
     
     # Train based on model type
     if model_type == "XGBoost":
-        print(f"\n🚀 Training XGBoost Model (optimized for 80% accuracy)...")
+        log(f"\n🚀 Training XGBoost Model (optimized for 80% accuracy)...")
         
-        model = XGBClassifier(
-            learning_rate=params.get('learning_rate', 0.01),
-            max_depth=params.get('max_depth_xgb', 4),
-            n_estimators=params.get('n_estimators_xgb', 500),
-            scale_pos_weight=params.get('scale_pos_weight', 1.56),
-            subsample=params.get('subsample', 0.8),
-            colsample_bytree=params.get('colsample_bytree', 0.8),
-            gamma=params.get('gamma', 1.0),
-            min_child_weight=params.get('min_child_weight', 3),
-            reg_alpha=params.get('reg_alpha', 0.3),
-            reg_lambda=params.get('reg_lambda', 1.5),
-            random_state=random_state,
-            n_jobs=-1,
-            eval_metric='logloss'
-        )
-        print("  ✓ XGBoost configured with optimized hyperparameters")
+        model = _build_xgb(params, random_state, **xgb_parallel)
+        log("  ✓ XGBoost configured with optimized hyperparameters")
         
-        # Train with early stopping
+        # Train with early stopping. With tree_method='hist' the sklearn
+        # wrapper already bins X_tr into a QuantileDMatrix and builds the
+        # eval set with ref= to it, so validation reuses the training bins
         early_stop = params.get('early_stopping_rounds', 50)
+        model.set_params(early_stopping_rounds=early_stop)
         model.fit(
             X_tr, y_tr,
             eval_set=[(X_val, y_val)],
             verbose=False
         )
         
-        print(f"\n✓ XGBoost training completed!")
-        print(f"  - Best iteration: {model.best_iteration if hasattr(model, 'best_iteration') else 'N/A'}")
-        print(f"  - Training samples: {len(X_train)}")
-        print(f"  - Features: {X_train.shape[1]}")
+        log(f"\n✓ XGBoost training completed!")
+        if VERBOSE:
+            print(f"  - Best iteration: {model.best_iteration if hasattr(model, 'best_iteration') else 'N/A'}")
+        log(f"  - Training samples: {len(X_train)}")
+        log(f"  - Features: {X_train.shape[1]}")
         
     else:  # Ensemble mode
-        print(f"\n🌳 Initializing Ensemble Models...")
+        log(f"\n🌳 Initializing Ensemble Models...")
+        
+        # The three members are fitted in parallel processes, so split the
+        # cores between them instead of giving each one all of them.
+        # Only XGBoost moves to the GPU when one is available; RF and
+        # HistGradientBoosting stay scikit-learn on the CPU so the saved
+        # ensemble loads anywhere the API runs
+        inner_jobs = max(1, (os.cpu_count() or 3) // 3)
         
         # Model 1: RandomForest
         rf_model = RandomForestClassifier(
@@ -94,76 +166,85 @@ def train_ensemble_model(train_path, model_output_path):
             max_features=params.get('max_features', 'sqrt'),
             class_weight=params.get('class_weight', 'balanced'),
             random_state=random_state,
-            n_jobs=-1
+            n_jobs=inner_jobs
         )
-        print("  ✓ RandomForest configured")
+        log("  ✓ RandomForest configured")
         
         # Model 2: XGBoost
-        xgb_model = XGBClassifier(
-            learning_rate=params.get('learning_rate', 0.01),
-            max_depth=params.get('max_depth_xgb', 4),
-            n_estimators=params.get('n_estimators_xgb', 500),
-            scale_pos_weight=params.get('scale_pos_weight', 1.56),
-            subsample=params.get('subsample', 0.8),
-            colsample_bytree=params.get('colsample_bytree', 0.8),
-            gamma=params.get('gamma', 1.0),
-            min_child_weight=params.get('min_child_weight', 3),
-            reg_alpha=params.get('reg_alpha', 0.3),
-            reg_lambda=params.get('reg_lambda', 1.5),
-            random_state=random_state,
-            n_jobs=-1,
-            eval_metric='logloss'
-        )
-        print("  ✓ XGBoost configured")
+        xgb_member = dict(xgb_parallel)
+        if 'n_jobs' in xgb_member:
+            xgb_member['n_jobs'] = inner_jobs
+        xgb_model = _build_xgb(params, random_state, **xgb_member)
+        log("  ✓ XGBoost configured")
         
-        # Model 3: Gradient Boosting (fine-tuned for 80% target)
-        gb_model = GradientBoostingClassifier(
-            n_estimators=250,
+        # Model 3: Histogram Gradient Boosting (fine-tuned for 80% target)
+        gb_model = HistGradientBoostingClassifier(
+            max_iter=250,
             learning_rate=0.05,
             max_depth=4,
-            min_samples_split=18,
             min_samples_leaf=9,
-            max_features='sqrt',
-            subsample=0.75,
+            l2_regularization=0.0,
+            max_bins=255,
+            early_stopping=True,
+            validation_fraction=0.1,
+            n_iter_no_change=20,
             random_state=random_state
         )
-        print("  ✓ GradientBoosting configured (fine-tuned)")
+        log("  ✓ HistGradientBoosting configured (fine-tuned)")
         
         # Create Voting Ensemble
-        print(f"\n🗳️  Creating Voting Ensemble (soft voting)...")
-        model = VotingClassifier(
+        log(f"\n🗳️  Creating Voting Ensemble (soft voting)...")
+        model = SoftVoteEnsemble(
             estimators=[
                 ('rf', rf_model),
                 ('xgb', xgb_model),
                 ('gb', gb_model)
             ],
-            voting='soft',
-            n_jobs=-1
+            n_jobs=3
         )
         
         # Train the ensemble
-        print(f"\n🚀 Training Ensemble Model...")
-        model.fit(X_train, y_train)
+        log(f"\n🚀 Training Ensemble Model...")
+        # Back the features with a file so the member processes map the same
+        # pages (joblib sends memmaps by filename) instead of each
+        # unpickling a private copy
+        with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp_dir:
+            X_shared = np.memmap(os.path.join(tmp_dir, 'X_train.mm'), mode='w+',
+                                 dtype=np.float32, shape=X_train.shape)
+            X_shared[:] = X_train
+            X_shared.flush()
+            model.fit(X_shared, y_np)
+            del X_shared
         
-        print("\n✓ Ensemble training completed!")
-        print(f"  - Models in ensemble: RandomForest, XGBoost, GradientBoosting")
-        print(f"  - Voting method: soft (probability-based)")
-        print(f"  - Training samples: {len(X_train)}")
-        print(f"  - Features: {X_train.shape[1]}")
+        log("\n✓ Ensemble training completed!")
+        log(f"  - Models in ensemble: RandomForest, XGBoost, HistGradientBoosting")
+        log(f"  - Voting method: soft (probability-based)")
+        log(f"  - Training samples: {len(X_train)}")
+        log(f"  - Features: {X_train.shape[1]}")
+    
+    # The API, evaluation and prediction stages run on CPU; a model left on
+    # device='cuda' would fall back (with a warning) on every predict call
+    for estimator in [model, *getattr(model, 'estimators_', [])]:
+        if isinstance(estimator, XGBClassifier):
+            estimator.set_params(device='cpu')
     
     # Create output directory if it doesn't exist
     os.makedirs(os.path.dirname(model_output_path), exist_ok=True)
     
     # Save the trained model
-    print(f"\n💾 Saving model to {model_output_path}...")
-    joblib.dump(model, model_output_path)
+    log(f"\n💾 Saving model to {model_output_path}...")
+    # lz4 keeps the file small at negligible load-time CPU; protocol 5
+    # pickles the tree arrays without intermediate copies. XGBoost boosters
+    # pickle through XGBoost's own binary serializer, so the whole
+    # estimator is saved rather than a separate booster file
+    joblib.dump(model, model_output_path, compress=('lz4', 3), protocol=5)
     
     print(f"\n✅ Model saved successfully! (Type: {model_type})")
 
 
 if __name__ == "__main__":
     # Define paths
-    TRAIN_PATH = "data/train.csv"
+    TRAIN_PATH = "data/train.parquet"
     MODEL_OUTPUT_PATH = "models/model.joblib"
     
     # Run training
@@ -3,21 +3,32 @@ Test script for Water Potability Prediction API
 Run this after starting the FastAPI server to verify it's working correctly
 """
 
-import requests
-import json
+import httpx
+import orjson
+import msgpack
+import numpy as np
 
 # API base URL
 BASE_URL = "http://localhost:8000"
 
+# One pooled client for the whole run, so every test reuses the same
+# keep-alive connection instead of opening a new one
+client = httpx.Client(base_url=BASE_URL, timeout=120)
+
+
+def pjson(data):
+    """Pretty-print JSON-compatible data with 2-space indentation"""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+
 def test_health_check():
     """Test the health check endpoint"""
     print("\n" + "="*50)
     print("Testing Health Check Endpoint")
     print("="*50)
     
-    response = requests.get(f"{BASE_URL}/health")
+    response = client.get("/health")
     print(f"Status Code: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    print(f"Response: {pjson(response.json())}")
     
     assert response.status_code == 200, "Health check failed!"
     print("✓ Health check passed!")
@@ -42,15 +53,12 @@ def test_single_prediction():
         "Turbidity": 4.0
     }
     
-    print(f"Input: {json.dumps(sample_data, indent=2)}")
+    print(f"Input: {pjson(sample_data)}")
     
-    response = requests.post(
-        f"{BASE_URL}/predict",
-        json=sample_data
-    )
+    response = client.post("/predict", json=sample_data)
     
     print(f"\nStatus Code: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    print(f"Response: {pjson(response.json())}")
     
     assert response.status_code == 200, "Prediction failed!"
     
@@ -107,19 +115,33 @@ def test_batch_prediction():
     
     print(f"Number of samples: {len(batch_data)}")
     
-    response = requests.post(
-        f"{BASE_URL}/predict/batch",
-        json=batch_data
-    )
+    response = client.post("/predict/batch", json=batch_data)
     
     print(f"\nStatus Code: {response.status_code}")
     result = response.json()
-    print(f"Response: {json.dumps(result, indent=2)}")
+    print(f"Response: {pjson(result)}")
     
     assert response.status_code == 200, "Batch prediction failed!"
     assert "predictions" in result, "Missing 'predictions' in response"
     assert len(result["predictions"]) == 3, "Expected 3 predictions"
     
+    # Same samples as one float32 matrix over the msgpack endpoint
+    matrix = np.asarray(
+        [list(sample.values()) for sample in batch_data], dtype=np.float32
+    )
+    response = client.post(
+        "/predict/batch_bin",
+        content=msgpack.packb({"shape": list(matrix.shape), "data": matrix.tobytes()}),
+        headers={"content-type": "application/x-msgpack"}
+    )
+    
+    print(f"\nBinary Status Code: {response.status_code}")
+    binary_result = response.json()
+    
+    assert response.status_code == 200, "Binary batch prediction failed!"
+    assert [p["potability"] for p in binary_result["predictions"]] == \
+        [p["potability"] for p in result["predictions"]], "Binary and JSON predictions differ"
+    
     print("✓ Batch prediction passed!")
 
 
@@ -136,15 +158,12 @@ def test_invalid_input():
         # Missing other required fields
     }
     
-    print(f"Sending invalid input: {json.dumps(invalid_data, indent=2)}")
+    print(f"Sending invalid input: {pjson(invalid_data)}")
     
-    response = requests.post(
-        f"{BASE_URL}/predict",
-        json=invalid_data
-    )
+    response = client.post("/predict", json=invalid_data)
     
     print(f"\nStatus Code: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    print(f"Response: {pjson(response.json())}")
     
     assert response.status_code == 422, "Expected validation error!"
     print("✓ Invalid input handling passed!")
@@ -166,7 +185,7 @@ def run_all_tests():
         print("✅ All tests passed successfully!")
         print("="*50)
         
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print("\n❌ Error: Could not connect to the API")
         print("Please make sure the FastAPI server is running:")
         print("  python main.py")
@@ -177,6 +196,9 @@ def run_all_tests():
         
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
+        
+    finally:
+        client.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+"""
+Test script for the SoftVoteEnsemble / cross-validation helpers
+Runs offline (no API server needed): python test_ensemble.py or pytest test_ensemble.py
+"""
+
+import os
+import sys
+
+# Add src directory to path, as main.py does
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+from ensemble import SoftVoteEnsemble, SMALL_BATCH
+from cv_utils import single_threaded_clone
+
+
+def make_ensemble():
+    return SoftVoteEnsemble(
+        estimators=[
+            ('rf', RandomForestClassifier(n_estimators=10, n_jobs=4)),
+            ('xgb', XGBClassifier(n_estimators=10, n_jobs=4))
+        ],
+        n_jobs=3
+    )
+
+
+def test_member_params_exposed():
+    """Member parameters are reachable as <name>__<param>"""
+    params = make_ensemble().get_params(deep=True)
+    
+    assert params['rf__n_jobs'] == 4, "Missing rf__n_jobs"
+    assert params['xgb__n_jobs'] == 4, "Missing xgb__n_jobs"
+    print("✓ Member params exposed!")
+
+
+def test_single_threaded_clone():
+    """single_threaded_clone resets n_jobs on the ensemble and every member"""
+    model = make_ensemble()
+    cloned = single_threaded_clone(model)
+    
+    assert cloned.n_jobs == 1, "Ensemble n_jobs not reset"
+    for name, estimator in cloned.estimators:
+        assert estimator.n_jobs == 1, f"{name} n_jobs not reset"
+    
+    # The original is left untouched
+    for name, estimator in model.estimators:
+        assert estimator.n_jobs == 4, f"{name} n_jobs changed on the original"
+    print("✓ Single-threaded clone passed!")
+
+
+def test_predict_proba_matches_voting_classifier():
+    """
+    Soft-vote probabilities equal VotingClassifier's on the same members
+    
+    Covers both sides of SMALL_BATCH: up to it, forests are scored by the
+    direct tree loop in ensemble._forest_proba, above it by predict_proba.
+    """
+    X, y = make_classification(n_samples=400, n_features=9, random_state=0)
+    X = X.astype(np.float32)
+    members = [
+        ('rf', RandomForestClassifier(n_estimators=25, max_depth=6, random_state=0)),
+        ('lr', LogisticRegression())
+    ]
+    
+    ensemble = SoftVoteEnsemble(estimators=members, n_jobs=1).fit(X, y)
+    voting = VotingClassifier(estimators=members, voting='soft').fit(X, y)
+    
+    for n_rows in (1, SMALL_BATCH, SMALL_BATCH + 1):
+        expected = voting.predict_proba(X[:n_rows])
+        actual = ensemble.predict_proba(X[:n_rows])
+        
+        assert actual.shape == expected.shape, f"Wrong shape for {n_rows} rows"
+        assert np.allclose(actual, expected, rtol=0, atol=1e-12), \
+            f"Probabilities differ from VotingClassifier for {n_rows} rows"
+        assert (ensemble.predict(X[:n_rows]) == voting.predict(X[:n_rows])).all(), \
+            f"Predictions differ from VotingClassifier for {n_rows} rows"
+    print("✓ Probabilities match VotingClassifier!")
+
+
+if __name__ == "__main__":
+    test_member_params_exposed()
+    test_single_threaded_clone()
+    test_predict_proba_matches_voting_classifier()
+    print("\n✅ All tests passed successfully!")
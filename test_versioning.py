@@ -2,11 +2,18 @@
 Test script for model versioning features
 """
 
-import requests
-import json
+import httpx
+import orjson
 
 API_BASE_URL = "http://127.0.0.1:8000"
 
+# One pooled client for the whole run; retraining can take a while
+client = httpx.Client(base_url=API_BASE_URL, timeout=120)
+
+def pjson(data):
+    """Pretty-print JSON-compatible data with 2-space indentation"""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+
 def print_section(title):
     print("\n" + "="*60)
     print(f"  {title}")
@@ -16,10 +23,10 @@ def test_list_versions():
     """Test listing all model versions"""
     print_section("Test 1: List Model Versions")
     
-    response = requests.get(f"{API_BASE_URL}/models/versions")
+    response = client.get("/models/versions")
     print(f"Status: {response.status_code}")
     
-    if response.ok:
+    if response.is_success:
         data = response.json()
         print(f"\nCurrent Version: {data['current_version']}")
         print(f"Total Versions: {data['total_versions']}")
@@ -37,13 +44,13 @@ def test_get_current_model():
     """Test getting current model info"""
     print_section("Test 2: Get Current Model")
     
-    response = requests.get(f"{API_BASE_URL}/models/current")
+    response = client.get("/models/current")
     print(f"Status: {response.status_code}")
     
-    if response.ok:
+    if response.is_success:
         data = response.json()
         print(f"\nCurrent Model: {data['version']}")
-        print(f"Details: {json.dumps(data['info'], indent=2)}")
+        print(f"Details: {pjson(data['info'])}")
     else:
         print(f"Error: {response.text}")
 
@@ -63,10 +70,10 @@ def test_prediction():
         "Turbidity": 4.0
     }
     
-    response = requests.post(f"{API_BASE_URL}/predict", json=sample_data)
+    response = client.post("/predict", json=sample_data)
     print(f"Status: {response.status_code}")
     
-    if response.ok:
+    if response.is_success:
         data = response.json()
         print(f"\nPrediction: {data['potability_label']}")
         print(f"Confidence: {data['confidence']:.4f}")
@@ -89,10 +96,10 @@ def test_retrain(sample_data):
     }
     
     print("Starting retraining... (this may take a minute)")
-    response = requests.post(f"{API_BASE_URL}/retrain", json=retrain_request, timeout=120)
+    response = client.post("/retrain", json=retrain_request)
     print(f"Status: {response.status_code}")
     
-    if response.ok:
+    if response.is_success:
         data = response.json()
         print(f"\n✅ Retraining Successful!")
         print(f"New Version: {data['version']}")
@@ -108,8 +115,8 @@ def test_switch_version():
     print_section("Test 5: Switch Version")
     
     # First, get list of versions
-    versions_response = requests.get(f"{API_BASE_URL}/models/versions")
-    if not versions_response.ok:
+    versions_response = client.get("/models/versions")
+    if not versions_response.is_success:
         print("Cannot get versions list")
         return
     
@@ -118,10 +125,10 @@ def test_switch_version():
     # Try switching to Original
     print("\nSwitching to Original version...")
     switch_request = {"version": "Original"}
-    response = requests.post(f"{API_BASE_URL}/models/switch", json=switch_request)
+    response = client.post("/models/switch", json=switch_request)
     print(f"Status: {response.status_code}")
     
-    if response.ok:
+    if response.is_success:
         data = response.json()
         print(f"✅ {data['message']}")
     else:
@@ -160,11 +167,13 @@ def main():
         
         print_section("✅ All Tests Completed!")
         
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print("\n❌ Error: Cannot connect to API server!")
         print("Make sure the server is running on http://127.0.0.1:8000")
     except Exception as e:
         print(f"\n❌ Error: {e}")
+    finally:
+        client.close()
 
 if __name__ == "__main__":
     main()
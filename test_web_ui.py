@@ -5,32 +5,66 @@ Automatically opens the web interface in Chrome browser
 
 import webbrowser
 import time
-import requests
+import asyncio
+import httpx
+import shutil
 import sys
 import os
 
 API_URL = "http://127.0.0.1:8000"
 FRONTEND_URL = f"{API_URL}/"
 
+# Standard Windows install locations (not on PATH), expanded once
+CHROME_INSTALL_PATHS = [
+    os.path.expandvars(path) for path in (
+        r'%ProgramFiles%\Google\Chrome\Application\chrome.exe',
+        r'%ProgramFiles(x86)%\Google\Chrome\Application\chrome.exe',
+        r'%LOCALAPPDATA%\Google\Chrome\Application\chrome.exe'
+    )
+]
+
 def check_server_running():
     """Check if the API server is running"""
     try:
-        response = requests.get(f"{API_URL}/health", timeout=2)
+        response = httpx.get(f"{API_URL}/health", timeout=2)
         return response.status_code == 200
     except:
         return False
 
-def wait_for_server(max_attempts=10, delay=1):
+async def _probe(deadline, interval):
+    """Poll /health on one connection until it answers 200 or the deadline passes"""
+    async with httpx.AsyncClient(timeout=0.2) as client:
+        while time.monotonic() < deadline:
+            try:
+                response = await client.get(f"{API_URL}/health")
+                if response.status_code == 200:
+                    return True
+            except httpx.RequestError:
+                pass
+            await asyncio.sleep(interval)
+    return False
+
+def wait_for_server(timeout=10, interval=0.05):
     """Wait for server to start"""
     print("🔍 Checking if server is running...")
-    for attempt in range(max_attempts):
-        if check_server_running():
-            print("✅ Server is running!")
-            return True
-        print(f"⏳ Waiting for server... ({attempt + 1}/{max_attempts})")
-        time.sleep(delay)
+    if asyncio.run(_probe(time.monotonic() + timeout, interval)):
+        print("✅ Server is running!")
+        return True
+    print(f"❌ Server did not respond within {timeout}s")
     return False
 
+def find_chrome():
+    """Path to the Chrome executable, or None if it is not installed"""
+    # On PATH first (on Windows, PATHEXT makes "chrome" match chrome.exe)
+    chrome_path = shutil.which("chrome") or shutil.which("google-chrome")
+    if chrome_path:
+        return chrome_path
+    
+    for path in CHROME_INSTALL_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
 def open_browser():
     """Open the web interface in Chrome"""
     print(f"\n🌐 Opening web interface in browser...")
@@ -38,19 +72,7 @@ def open_browser():
     
     try:
         # Try to open in Chrome specifically
-        chrome_path = None
-        
-        # Common Chrome paths
-        chrome_paths = [
-            'C:/Program Files/Google/Chrome/Application/chrome.exe',
-            'C:/Program Files (x86)/Google/Chrome/Application/chrome.exe',
-            r'C:\Users\%USERNAME%\AppData\Local\Google\Chrome\Application\chrome.exe'
-        ]
-        
-        for path in chrome_paths:
-            if os.path.exists(path.replace('%USERNAME%', os.environ.get('USERNAME', ''))):
-                chrome_path = path.replace('%USERNAME%', os.environ.get('USERNAME', ''))
-                break
+        chrome_path = find_chrome()
         
         if chrome_path:
             webbrowser.register('chrome', None, webbrowser.BackgroundBrowser(chrome_path))